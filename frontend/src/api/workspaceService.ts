@@ -21,7 +21,9 @@ export const listWorkspaces = async (
   limit: number = 12,
   skip: number = 0
 ): Promise<Workspace[]> => {
-  const response = await api.get('/workspaces', { params: { limit, skip } })
+  const response = await api.get('/workspaces', {
+    params: { limit, skip, include: 'skills' },
+  })
   return response.data
 }
 
@@ -29,7 +31,9 @@ export const listWorkspaces = async (
  * Get a workspace by ID with skill details.
  */
 export const getWorkspace = async (workspaceId: string): Promise<Workspace> => {
-  const response = await api.get(`/workspaces/${workspaceId}`)
+  const response = await api.get(`/workspaces/${workspaceId}`, {
+    params: { include: 'skills' },
+  })
   return response.data
 }
 
@@ -149,6 +153,7 @@ export const chatInWorkspaceThread = (
       // Read the SSE stream
       const reader = response.body?.getReader()
       const decoder = new TextDecoder()
+      let buffer = ''
 
       const readStream = () => {
         reader?.read().then(({ done, value }) => {
@@ -157,9 +162,10 @@ export const chatInWorkspaceThread = (
             return
           }
 
-          // Decode the chunk
-          const chunk = decoder.decode(value, { stream: true })
-          const lines = chunk.split('\n')
+          // Decode the chunk; a frame may span several reads
+          buffer += decoder.decode(value, { stream: true })
+          const lines = buffer.split('\n')
+          buffer = lines.pop() || '' // Keep incomplete line in buffer
 
           for (const line of lines) {
             if (line.startsWith('data: ')) {
@@ -19,10 +19,14 @@ sys.path.insert(0, str(src_path))
 import uvicorn
 
 if __name__ == "__main__":
+    from metropolis.config.settings import server_config
+
     uvicorn.run(
         "metropolis.app:app",
         host="0.0.0.0",
         port=8088,
         reload=False,  # Enable auto-reload during development
         log_level="info",
+        # Refuse oversized WebSocket frames before they are buffered
+        ws_max_size=server_config.max_client_message_bytes,
     )
@@ -3,7 +3,8 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from metropolis.config.settings import db_config
+from metropolis.config.settings import db_config, server_config
+from metropolis.db.client import close_mongo_client, get_mongo_client
 from metropolis.db.session_store import SessionStore
 from metropolis.db.skill_store import SkillStore
 from metropolis.db.workflow_store import WorkflowStore
@@ -17,6 +18,7 @@ from metropolis.routes.skill_routes import router as skill_router
 from metropolis.routes.workflow_routes import init_workflow_store
 from metropolis.routes.workflow_routes import router as workflow_router
 from metropolis.routes.workspace_routes import (
+    close_workspace_service,
     init_file_service,
     init_workspace_store,
     init_workspace_thread_store,
@@ -37,9 +39,14 @@ async def lifespan(app: FastAPI):
     # Startup
     print("Starting Metropolis Agent API...")
 
+    # One MongoDB client (and connection pool) shared by every store
+    mongo_client = get_mongo_client()
+
     # Initialize MongoDB session store
     session_store = SessionStore(
-        mongodb_uri=db_config.uri, database_name=db_config.database
+        mongodb_uri=db_config.uri,
+        database_name=db_config.database,
+        client=mongo_client,
     )
     await session_store.create_indexes()
     print("MongoDB session store initialized")
@@ -49,7 +56,9 @@ async def lifespan(app: FastAPI):
 
     # Initialize MongoDB skill store
     skill_store = SkillStore(
-        mongodb_uri=db_config.uri, database_name=db_config.database
+        mongodb_uri=db_config.uri,
+        database_name=db_config.database,
+        client=mongo_client,
     )
     await skill_store.create_indexes()
     print("MongoDB skill store initialized")
@@ -59,7 +68,9 @@ async def lifespan(app: FastAPI):
 
     # Initialize MongoDB workflow store
     workflow_store = WorkflowStore(
-        mongodb_uri=db_config.uri, database_name=db_config.database
+        mongodb_uri=db_config.uri,
+        database_name=db_config.database,
+        client=mongo_client,
     )
     await workflow_store.create_indexes()
     print("MongoDB workflow store initialized")
@@ -76,14 +87,18 @@ async def lifespan(app: FastAPI):
 
     # Initialize MongoDB workspace store
     workspace_store = WorkspaceStore(
-        mongodb_uri=db_config.uri, database_name=db_config.database
+        mongodb_uri=db_config.uri,
+        database_name=db_config.database,
+        client=mongo_client,
     )
     await workspace_store.create_indexes()
     print("MongoDB workspace store initialized")
 
     # Initialize MongoDB workspace thread store
     workspace_thread_store = WorkspaceThreadStore(
-        mongodb_uri=db_config.uri, database_name=db_config.database
+        mongodb_uri=db_config.uri,
+        database_name=db_config.database,
+        client=mongo_client,
     )
     await workspace_thread_store.create_indexes()
     print("MongoDB workspace thread store initialized")
@@ -102,18 +117,24 @@ async def lifespan(app: FastAPI):
     jsonl_handler = JSONLHandler()
     print("JSONL handler initialized")
 
-    init_agent_manager(session_store, main_agent_option, jsonl_handler)
+    agent_manager = init_agent_manager(session_store, main_agent_option, jsonl_handler)
+    # Start the first new-session client now rather than on the first query
+    agent_manager.prewarm_client()
     print("Agent manager initialized")
 
     yield
 
     # Shutdown
     print("Shutting down Metropolis Agent API...")
+    await agent_manager.cleanup_all()
+    # Let in-flight workspace JSONL persists finish before the client closes
+    await close_workspace_service()
     await session_store.close()
     await skill_store.close()
     await workflow_store.close()
     await workspace_store.close()
     await workspace_thread_store.close()
+    await close_mongo_client()
     print("MongoDB connection closed")
 
 
@@ -139,6 +160,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include routers
@@ -167,4 +189,10 @@ async def root():
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=8088)
+    # Refuse oversized WebSocket frames before they are buffered
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8088,
+        ws_max_size=server_config.max_client_message_bytes,
+    )
@@ -1,5 +1,5 @@
 """Configuration module for Metropolis application."""
 
-from .settings import db_config, session_config
+from .settings import db_config, server_config, session_config
 
-__all__ = ["db_config", "session_config"]
+__all__ = ["db_config", "server_config", "session_config"]
@@ -0,0 +1,82 @@
+"""Shared MongoDB client for all stores."""
+
+import asyncio
+import weakref
+
+from pymongo import AsyncMongoClient
+
+from metropolis.config.settings import db_config
+
+# Maximum number of heavy chat/workflow persistence writes in flight at once
+MONGO_WRITE_CONCURRENCY = 32
+
+# One client per event loop, shared so every store on that loop draws from a
+# single connection pool (an async client must not be used across loops)
+_mongo_clients: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, AsyncMongoClient
+] = weakref.WeakKeyDictionary()
+# One write semaphore per event loop, for the same reason: an asyncio
+# primitive binds to the loop that first waits on it
+_write_semaphores: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, asyncio.Semaphore
+] = weakref.WeakKeyDictionary()
+
+
+def get_mongo_client() -> AsyncMongoClient:
+    """
+    Get the shared MongoDB client for the running event loop.
+
+    The client is created on first use in each loop, so scripts that call
+    asyncio.run() more than once never reuse a client bound to a closed loop.
+
+    Returns:
+        AsyncMongoClient configured with the pool and compression settings
+        from db_config
+
+    Raises:
+        RuntimeError: If called outside a running event loop
+    """
+    loop = asyncio.get_running_loop()
+    client = _mongo_clients.get(loop)
+    if client is None:
+        client = AsyncMongoClient(
+            db_config.uri,
+            maxPoolSize=db_config.max_pool_size,
+            minPoolSize=db_config.min_pool_size,
+            maxIdleTimeMS=db_config.max_idle_time_ms,
+            compressors=db_config.compressors,
+            zlibCompressionLevel=db_config.zlib_compression_level,
+            retryWrites=True,
+        )
+        _mongo_clients[loop] = client
+    return client
+
+
+def get_write_semaphore() -> asyncio.Semaphore:
+    """
+    Get the running event loop's semaphore bounding concurrent persistence writes.
+
+    Services hold it around per-turn persistence (messages, JSONL, workflow
+    logs) so a burst of finishing streams queues up instead of flooding the
+    server with parallel writes. Look it up at the point of use rather than
+    caching it, so it always belongs to the current loop.
+
+    Returns:
+        Semaphore allowing MONGO_WRITE_CONCURRENCY concurrent writers
+
+    Raises:
+        RuntimeError: If called outside a running event loop
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = _write_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(MONGO_WRITE_CONCURRENCY)
+        _write_semaphores[loop] = semaphore
+    return semaphore
+
+
+async def close_mongo_client():
+    """Close the running event loop's shared MongoDB client, if it was created."""
+    client = _mongo_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
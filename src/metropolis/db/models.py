@@ -29,8 +29,11 @@ class ClaudeAgentSession(BaseModel):
         default=None, description="Optional workspace ID for workspace threads"
     )
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    updated_at: datetime = Field(default_factory=lambda data: data["created_at"])
     message_count: int = Field(default=0)
+    next_seq: int = Field(
+        default=0, description="Next free message sequence number (atomic counter)"
+    )
     metadata: SessionMetadata = Field(default_factory=SessionMetadata)
     is_active: bool = Field(default=True)
 
@@ -113,7 +116,7 @@ class ClaudeAgentSkill(BaseModel):
     title: str = Field(..., description="Skill title")
     content: str = Field(..., description="Markdown content")
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    updated_at: datetime = Field(default_factory=lambda data: data["created_at"])
 
     class Config:
         populate_by_name = True
@@ -160,7 +163,7 @@ class Workspace(BaseModel):
         default_factory=list, description="List of skill IDs in this workspace"
     )
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    updated_at: datetime = Field(default_factory=lambda data: data["created_at"])
 
     class Config:
         populate_by_name = True
@@ -198,8 +201,11 @@ class WorkspaceThread(BaseModel):
         description="Session ID from Claude Agent SDK (used as thread_id in routes)",
     )
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    updated_at: datetime = Field(default_factory=lambda data: data["created_at"])
     message_count: int = Field(default=0)
+    next_seq: int = Field(
+        default=0, description="Next free message sequence number (atomic counter)"
+    )
     metadata: SessionMetadata = Field(default_factory=SessionMetadata)
     is_active: bool = Field(default=True)
 
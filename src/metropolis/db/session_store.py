@@ -1,11 +1,67 @@
 """MongoDB session store for persisting Claude Agent SDK sessions."""
 
+import asyncio
 from datetime import UTC, datetime
-from typing import Optional
+from typing import AsyncGenerator, AsyncIterator, Optional
+
+from pymongo import (
+    ASCENDING,
+    DESCENDING,
+    AsyncMongoClient,
+    IndexModel,
+    ReturnDocument,
+)
+from pymongo.errors import OperationFailure
+
+from .models import (
+    ClaudeAgentMessage,
+    ClaudeAgentSession,
+    MessageRole,
+    SessionMetadata,
+)
+
+# Message indexes created by earlier versions; messages are read by
+# (session_id, sequence) only, so these are dropped at startup
+LEGACY_MESSAGE_INDEXES = ("session_id_1_created_at_1",)
+
+# Documents per cursor batch when reading a whole session; larger than the
+# server's 101-document first batch so long sessions need fewer getMores
+SESSION_READ_BATCH_SIZE = 1000
+
+
+def _session_from_doc(doc: dict) -> ClaudeAgentSession:
+    """
+    Build a session from a stored document without re-validating it.
+
+    Documents were validated when they were written, so only the ObjectId
+    and the nested metadata model need converting.
+
+    Args:
+        doc: Raw MongoDB session document
+
+    Returns:
+        Session object
+    """
+    doc["_id"] = str(doc["_id"])
+    metadata = doc.get("metadata")
+    if metadata is not None:
+        doc["metadata"] = SessionMetadata.model_construct(**metadata)
+    return ClaudeAgentSession.model_construct(**doc)
 
-from pymongo import ASCENDING, DESCENDING, AsyncMongoClient
 
-from .models import ClaudeAgentMessage, ClaudeAgentSession
+def _message_from_doc(doc: dict) -> ClaudeAgentMessage:
+    """
+    Build a message from a stored document without re-validating it.
+
+    Args:
+        doc: Raw MongoDB message document
+
+    Returns:
+        Message object
+    """
+    doc["_id"] = str(doc["_id"])
+    doc["role"] = MessageRole(doc["role"])
+    return ClaudeAgentMessage.model_construct(**doc)
 
 
 class SessionStore:
@@ -15,15 +71,23 @@ class SessionStore:
     Uses PyMongo Async for asynchronous database operations.
     """
 
-    def __init__(self, mongodb_uri: str, database_name: str):
+    def __init__(
+        self,
+        mongodb_uri: str,
+        database_name: str,
+        client: Optional[AsyncMongoClient] = None,
+    ):
         """
         Initialize the session store.
 
         Args:
             mongodb_uri: MongoDB connection string
             database_name: Name of the database to use
+            client: Shared MongoDB client. If None, the store creates and
+                closes its own.
         """
-        self.client = AsyncMongoClient(mongodb_uri)
+        self._owns_client = client is None
+        self.client = client if client is not None else AsyncMongoClient(mongodb_uri)
         self.db = self.client[database_name]
         self.sessions = self.db["claude_agent_sdk_sessions"]
         self.messages = self.db["claude_agent_sdk_messages"]
@@ -31,26 +95,42 @@ class SessionStore:
 
     async def create_indexes(self):
         """Create indexes on startup for optimal query performance."""
-        # Session indexes
-        await self.sessions.create_index("claude_session_id", unique=True)
-        await self.sessions.create_index(
-            [("created_at", DESCENDING), ("is_active", ASCENDING)]
-        )
-        # Index for workspace threads
-        await self.sessions.create_index("workspace_id")
-
-        # Message indexes
-        await self.messages.create_index(
-            [("session_id", ASCENDING), ("sequence", ASCENDING)], unique=True
-        )
-        await self.messages.create_index(
-            [("session_id", ASCENDING), ("created_at", ASCENDING)]
+        # The collections are independent, so their index builds run
+        # concurrently; each collection's indexes go in one createIndexes call
+        await asyncio.gather(
+            # Session indexes (workspace_id for workspace threads)
+            self.sessions.create_indexes(
+                [
+                    IndexModel("claude_session_id", unique=True),
+                    IndexModel([("created_at", DESCENDING), ("is_active", ASCENDING)]),
+                    IndexModel("workspace_id"),
+                ]
+            ),
+            # Message indexes
+            self.messages.create_indexes(
+                [
+                    IndexModel(
+                        [("session_id", ASCENDING), ("sequence", ASCENDING)],
+                        unique=True,
+                    ),
+                ]
+            ),
+            self._drop_legacy_message_indexes(),
+            # JSONL line indexes
+            self.jsonl_lines.create_index(
+                [("session_id", ASCENDING), ("line_number", ASCENDING)], unique=True
+            ),
         )
 
-        # JSONL line indexes
-        await self.jsonl_lines.create_index(
-            [("session_id", ASCENDING), ("line_number", ASCENDING)], unique=True
-        )
+    async def _drop_legacy_message_indexes(self):
+        """Drop message indexes no query uses any more (they only slow inserts)."""
+        for index_name in LEGACY_MESSAGE_INDEXES:
+            try:
+                await self.messages.drop_index(index_name)
+            except OperationFailure as e:
+                # Already dropped, or the collection does not exist yet
+                if e.code not in (26, 27):
+                    raise
 
     async def create_session(self, session: ClaudeAgentSession) -> ClaudeAgentSession:
         """
@@ -82,8 +162,7 @@ class SessionStore:
         """
         doc = await self.sessions.find_one({"claude_session_id": claude_session_id})
         if doc:
-            doc["_id"] = str(doc["_id"])
-            return ClaudeAgentSession(**doc)
+            return _session_from_doc(doc)
         return None
 
     async def update_session(self, claude_session_id: str, updates: dict) -> bool:
@@ -128,12 +207,9 @@ class SessionStore:
             .limit(limit)
         )
 
-        sessions = []
-        async for doc in cursor:
-            doc["_id"] = str(doc["_id"])
-            sessions.append(ClaudeAgentSession(**doc))
-
-        return sessions
+        # Resolve the cursor in one await, then build models in a single pass
+        docs = await cursor.to_list(length=limit or None)
+        return [_session_from_doc(doc) for doc in docs]
 
     async def delete_session(self, claude_session_id: str) -> bool:
         """
@@ -183,34 +259,90 @@ class SessionStore:
         Returns:
             List of messages sorted by sequence
         """
-        cursor = self.messages.find({"session_id": claude_session_id}).sort(
-            "sequence", ASCENDING
+        cursor = (
+            self.messages.find({"session_id": claude_session_id})
+            .sort("sequence", ASCENDING)
+            .batch_size(SESSION_READ_BATCH_SIZE)
         )
 
-        messages = []
-        async for doc in cursor:
-            doc["_id"] = str(doc["_id"])
-            messages.append(ClaudeAgentMessage(**doc))
+        docs = await cursor.to_list(length=None)
+        return [_message_from_doc(doc) for doc in docs]
+
+    async def stream_session_messages(
+        self, claude_session_id: str
+    ) -> AsyncIterator[ClaudeAgentMessage]:
+        """
+        Stream messages for a session in order without materializing them.
+
+        Args:
+            claude_session_id: The Claude session ID
 
-        return messages
+        Yields:
+            Messages sorted by sequence
+        """
+        cursor = (
+            self.messages.find({"session_id": claude_session_id})
+            .sort("sequence", ASCENDING)
+            .batch_size(SESSION_READ_BATCH_SIZE)
+        )
+
+        async for doc in cursor:
+            yield _message_from_doc(doc)
 
-    async def get_next_sequence(self, claude_session_id: str) -> int:
+    async def get_next_sequence(self, claude_session_id: str, count: int = 1) -> int:
         """
-        Get the next sequence number for a session.
+        Reserve the next sequence number(s) for a session.
+
+        Sequences come from an atomic ``next_seq`` counter on the session
+        document, so concurrent callers never receive the same number. New
+        sessions are created with the counter; an older session without one is
+        seeded once from its last stored message.
 
         Args:
             claude_session_id: The Claude session ID
+            count: How many consecutive sequence numbers to reserve
 
         Returns:
-            The next available sequence number (0 if no messages exist)
+            The first reserved sequence number (0 if no messages exist)
         """
-        last_message = await self.messages.find_one(
-            {"session_id": claude_session_id}, sort=[("sequence", DESCENDING)]
+        doc = await self.sessions.find_one_and_update(
+            {"claude_session_id": claude_session_id, "next_seq": {"$exists": True}},
+            {"$inc": {"next_seq": count}},
+            projection={"next_seq": 1, "_id": 0},
+            return_document=ReturnDocument.AFTER,
         )
+        if doc:
+            return doc["next_seq"] - count
 
-        if last_message:
-            return last_message["sequence"] + 1
-        return 0
+        # No counter yet: seed it past the last stored message ($max keeps a
+        # concurrently seeded counter from moving backwards). The projection
+        # and hint make this a covered read of one (session_id, sequence) index
+        # key, with no document fetch
+        last_message = await self.messages.find_one(
+            {"session_id": claude_session_id},
+            sort=[("sequence", DESCENDING)],
+            projection={"sequence": 1, "_id": 0},
+            hint=[("session_id", ASCENDING), ("sequence", ASCENDING)],
+        )
+        start = last_message["sequence"] + 1 if last_message else 0
+        doc = await self.sessions.find_one_and_update(
+            {"claude_session_id": claude_session_id},
+            [
+                {
+                    "$set": {
+                        "next_seq": {
+                            "$add": [
+                                {"$max": [{"$ifNull": ["$next_seq", 0]}, start]},
+                                count,
+                            ]
+                        }
+                    }
+                }
+            ],
+            projection={"next_seq": 1, "_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+        return doc["next_seq"] - count if doc else start
 
     async def increment_message_count(self, claude_session_id: str):
         """
@@ -251,21 +383,83 @@ class SessionStore:
             },
         )
 
+    async def persist_turn(
+        self,
+        claude_session_id: str,
+        user_msg: ClaudeAgentMessage,
+        assistant_msg: ClaudeAgentMessage,
+        cost_usd: Optional[float] = None,
+        input_tokens: Optional[int] = None,
+        output_tokens: Optional[int] = None,
+    ):
+        """
+        Persist a complete user/assistant turn in two writes.
+
+        Inserts both messages with a single insert_many and folds the message
+        count and usage updates into one session update, replacing separate
+        save_message, increment_message_count and update_session_usage calls.
+        The session is only updated once the insert has succeeded, so its
+        counters never count messages that were not stored.
+
+        Args:
+            claude_session_id: The Claude session ID
+            user_msg: The user message of the turn
+            assistant_msg: The assistant message of the turn
+            cost_usd: Session cost reported by the SDK, if any
+            input_tokens: Input tokens to add to total, if any
+            output_tokens: Output tokens to add to total, if any
+        """
+        inc: dict = {"message_count": 2}
+        set_fields: dict = {"updated_at": datetime.now(UTC)}
+        if (
+            cost_usd is not None
+            or input_tokens is not None
+            or output_tokens is not None
+        ):
+            inc["total_input_tokens"] = input_tokens or 0
+            inc["total_output_tokens"] = output_tokens or 0
+            set_fields["total_cost_usd"] = cost_usd or 0.0
+
+        await self.messages.insert_many(
+            [
+                msg.model_dump(by_alias=True, exclude={"id"})
+                for msg in (user_msg, assistant_msg)
+            ]
+        )
+        await self.sessions.update_one(
+            {"claude_session_id": claude_session_id},
+            {"$inc": inc, "$set": set_fields},
+        )
+
     async def save_jsonl_lines(self, session_id: str, lines: list[str]):
         """
         Save JSONL lines for a session.
 
-        Deletes existing lines for the session and inserts new ones.
+        JSONL files only ever grow, so when the stored lines are a prefix of
+        ``lines`` only the new tail is inserted. Otherwise the existing lines
+        are replaced.
 
         Args:
             session_id: The Claude session ID
             lines: List of raw JSONL line strings
         """
-        # Delete existing lines for this session
-        await self.jsonl_lines.delete_many({"session_id": session_id})
+        # Find the last stored line (line numbers are contiguous from 0)
+        last = await self.jsonl_lines.find_one(
+            {"session_id": session_id},
+            sort=[("line_number", DESCENDING)],
+            projection={"line_number": 1, "line": 1},
+        )
+
+        start = 0
+        if last is not None:
+            start = last["line_number"] + 1
+            if start > len(lines) or lines[start - 1] != last["line"]:
+                # Stored lines diverged from the file; rewrite them all
+                await self.jsonl_lines.delete_many({"session_id": session_id})
+                start = 0
 
-        # If no lines to save, we're done
-        if not lines:
+        # If no new lines to save, we're done
+        if start >= len(lines):
             return
 
         # Prepare documents with line numbers
@@ -273,13 +467,13 @@ class SessionStore:
             {
                 "session_id": session_id,
                 "line_number": i,
-                "line": line,
+                "line": lines[i],
             }
-            for i, line in enumerate(lines)
+            for i in range(start, len(lines))
         ]
 
         # Bulk insert
-        await self.jsonl_lines.insert_many(documents)
+        await self.jsonl_lines.insert_many(documents, ordered=False)
 
     async def get_jsonl_lines(self, session_id: str) -> list[str]:
         """
@@ -291,15 +485,34 @@ class SessionStore:
         Returns:
             List of raw JSONL line strings sorted by line_number
         """
-        cursor = self.jsonl_lines.find({"session_id": session_id}).sort(
-            "line_number", ASCENDING
+        cursor = (
+            self.jsonl_lines.find({"session_id": session_id})
+            .sort("line_number", ASCENDING)
+            .batch_size(SESSION_READ_BATCH_SIZE)
         )
 
-        lines = []
-        async for doc in cursor:
-            lines.append(doc["line"])
+        return [doc["line"] for doc in await cursor.to_list(length=None)]
+
+    async def stream_jsonl_lines(self, session_id: str) -> AsyncGenerator[str, None]:
+        """
+        Stream JSONL lines for a session in order without materializing them.
 
-        return lines
+        Args:
+            session_id: The Claude session ID
+
+        Yields:
+            Raw JSONL line strings sorted by line_number
+        """
+        cursor = (
+            self.jsonl_lines.find(
+                {"session_id": session_id}, projection={"line": 1, "_id": 0}
+            )
+            .sort("line_number", ASCENDING)
+            .batch_size(SESSION_READ_BATCH_SIZE)
+        )
+
+        async for doc in cursor:
+            yield doc["line"]
 
     async def delete_jsonl_lines(self, session_id: str):
         """
@@ -311,5 +524,6 @@ class SessionStore:
         await self.jsonl_lines.delete_many({"session_id": session_id})
 
     async def close(self):
-        """Close the MongoDB connection."""
-        await self.client.close()
+        """Close the MongoDB connection if this store owns it."""
+        if self._owns_client:
+            await self.client.close()
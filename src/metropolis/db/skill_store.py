@@ -16,15 +16,23 @@ class SkillStore:
     Uses PyMongo Async for asynchronous database operations.
     """
 
-    def __init__(self, mongodb_uri: str, database_name: str):
+    def __init__(
+        self,
+        mongodb_uri: str,
+        database_name: str,
+        client: Optional[AsyncMongoClient] = None,
+    ):
         """
         Initialize the skill store.
 
         Args:
             mongodb_uri: MongoDB connection string
             database_name: Name of the database to use
+            client: Shared MongoDB client. If None, the store creates and
+                closes its own.
         """
-        self.client = AsyncMongoClient(mongodb_uri)
+        self._owns_client = client is None
+        self.client = client if client is not None else AsyncMongoClient(mongodb_uri)
         self.db = self.client[database_name]
         self.skills = self.db["claude_agent_sdk_skills"]
 
@@ -133,5 +141,6 @@ class SkillStore:
             return False
 
     async def close(self):
-        """Close the MongoDB connection."""
-        await self.client.close()
+        """Close the MongoDB connection if this store owns it."""
+        if self._owns_client:
+            await self.client.close()
@@ -1,5 +1,7 @@
 """MongoDB workspace store for persisting workspaces."""
 
+import time
+from collections import OrderedDict
 from datetime import UTC, datetime
 from typing import Optional
 
@@ -8,6 +10,10 @@ from pymongo import DESCENDING, AsyncMongoClient
 
 from .models import Workspace
 
+# Workspaces change rarely, so lookups are served from a short-lived cache
+WORKSPACE_CACHE_TTL_SECONDS = 30.0
+WORKSPACE_CACHE_MAX_SIZE = 1024
+
 
 class WorkspaceStore:
     """
@@ -16,17 +22,40 @@ class WorkspaceStore:
     Uses PyMongo Async for asynchronous database operations.
     """
 
-    def __init__(self, mongodb_uri: str, database_name: str):
+    def __init__(
+        self,
+        mongodb_uri: str,
+        database_name: str,
+        client: Optional[AsyncMongoClient] = None,
+    ):
         """
         Initialize the workspace store.
 
         Args:
             mongodb_uri: MongoDB connection string
             database_name: Name of the database to use
+            client: Shared MongoDB client. If None, the store creates and
+                closes its own.
         """
-        self.client = AsyncMongoClient(mongodb_uri)
+        self._owns_client = client is None
+        self.client = client if client is not None else AsyncMongoClient(mongodb_uri)
         self.db = self.client[database_name]
         self.workspaces = self.db["workspaces"]
+        # workspace_id -> (expires_at, workspace), oldest entries first
+        self._cache: OrderedDict[str, tuple[float, Workspace]] = OrderedDict()
+        # Bumped on every invalidation; a lookup only caches its result if no
+        # invalidation happened while it was reading
+        self._cache_generation = 0
+
+    def invalidate_cache(self, workspace_id: str):
+        """
+        Drop a workspace from the lookup cache.
+
+        Args:
+            workspace_id: The workspace's ObjectId as string
+        """
+        self._cache.pop(workspace_id, None)
+        self._cache_generation += 1
 
     async def create_indexes(self):
         """Create indexes on startup for optimal query performance."""
@@ -54,38 +83,67 @@ class WorkspaceStore:
         """
         Get a workspace by its ID.
 
+        Found workspaces are cached for WORKSPACE_CACHE_TTL_SECONDS; updates
+        and deletes through this store invalidate the entry.
+
         Args:
             workspace_id: The workspace's ObjectId as string
 
         Returns:
             Workspace object if found, None otherwise
         """
+        now = time.monotonic()
+        cached = self._cache.get(workspace_id)
+        if cached is not None:
+            expires_at, workspace = cached
+            if expires_at > now:
+                return workspace.model_copy(deep=True)
+            del self._cache[workspace_id]
+
+        generation = self._cache_generation
         try:
             doc = await self.workspaces.find_one({"_id": ObjectId(workspace_id)})
             if doc:
                 doc["_id"] = str(doc["_id"])
-                return Workspace(**doc)
+                workspace = Workspace(**doc)
+                # A write finished during the read: the document may be stale
+                if generation == self._cache_generation:
+                    self._cache[workspace_id] = (
+                        now + WORKSPACE_CACHE_TTL_SECONDS,
+                        workspace.model_copy(deep=True),
+                    )
+                    if len(self._cache) > WORKSPACE_CACHE_MAX_SIZE:
+                        self._cache.popitem(last=False)
+                return workspace
             return None
         except Exception:
             # Invalid ObjectId format
             return None
 
-    async def list_workspaces(self, limit: int = 12, skip: int = 0) -> list[Workspace]:
+    async def list_workspaces(
+        self, limit: int = 12, skip: int = 0, after_id: Optional[str] = None
+    ) -> list[Workspace]:
         """
-        List workspaces with pagination.
+        List workspaces with pagination, newest first.
+
+        Prefer keyset pagination via after_id: it seeks on the _id index so
+        deep pages cost the same as the first one. skip is kept for older
+        clients.
 
         Args:
             limit: Maximum number of workspaces to return
-            skip: Number of workspaces to skip (for pagination)
+            skip: Number of workspaces to skip (deprecated, use after_id)
+            after_id: Return workspaces older than this workspace ID
 
         Returns:
             List of workspace objects
         """
+        query = {}
+        if after_id:
+            query["_id"] = {"$lt": ObjectId(after_id)}
+
         cursor = (
-            self.workspaces.find()
-            .sort("created_at", DESCENDING)
-            .skip(skip)
-            .limit(limit)
+            self.workspaces.find(query).sort("_id", DESCENDING).skip(skip).limit(limit)
         )
 
         workspaces = []
@@ -95,26 +153,38 @@ class WorkspaceStore:
 
         return workspaces
 
-    async def update_workspace(self, workspace_id: str, updates: dict) -> bool:
+    async def update_workspace(self, workspace_id: str, updates: dict) -> int:
         """
-        Update workspace fields.
+        Update workspace fields in a single atomic write.
+
+        An empty updates dict is a no-op: nothing is written and only the
+        workspace's existence is checked.
 
         Args:
             workspace_id: The workspace's ObjectId as string
             updates: Dictionary of fields to update
 
         Returns:
-            True if workspace was updated, False if not found
+            Number of workspaces matched by the update (0 if not found)
         """
         try:
+            if not updates:
+                return await self.workspaces.count_documents(
+                    {"_id": ObjectId(workspace_id)}, limit=1
+                )
+
             updates["updated_at"] = datetime.now(UTC)
             result = await self.workspaces.update_one(
                 {"_id": ObjectId(workspace_id)}, {"$set": updates}
             )
-            return result.modified_count > 0
+            return result.matched_count
         except Exception:
             # Invalid ObjectId format
-            return False
+            return 0
+        finally:
+            # After the write, so a read racing with it cannot re-cache the
+            # old document
+            self.invalidate_cache(workspace_id)
 
     async def delete_workspace(self, workspace_id: str) -> bool:
         """
@@ -132,7 +202,11 @@ class WorkspaceStore:
         except Exception:
             # Invalid ObjectId format
             return False
+        finally:
+            # After the delete, so a racing read cannot re-cache the workspace
+            self.invalidate_cache(workspace_id)
 
     async def close(self):
-        """Close the MongoDB connection."""
-        await self.client.close()
+        """Close the MongoDB connection if this store owns it."""
+        if self._owns_client:
+            await self.client.close()
@@ -1,12 +1,23 @@
 """MongoDB store for persisting workspace threads and messages."""
 
+import asyncio
 from datetime import UTC, datetime
-from typing import Optional
+from typing import AsyncGenerator, Optional
 
-from pymongo import ASCENDING, DESCENDING, AsyncMongoClient
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, AsyncMongoClient, ReturnDocument
+from pymongo.errors import OperationFailure
 
 from .models import FileMetadata, WorkspaceMessage, WorkspaceThread
 
+# Thread indexes created by earlier versions; (workspace_id, _id) now serves
+# every workspace_id query, so these are dropped at startup
+LEGACY_THREAD_INDEXES = ("workspace_id_1",)
+
+# Lines per cursor batch when restoring a JSONL file; larger than the
+# server's 101-document first batch so long threads need fewer getMores
+JSONL_READ_BATCH_SIZE = 1000
+
 
 class WorkspaceThreadStore:
     """
@@ -16,15 +27,23 @@ class WorkspaceThreadStore:
     Stores workspace-specific conversations with execution environment tracking.
     """
 
-    def __init__(self, mongodb_uri: str, database_name: str):
+    def __init__(
+        self,
+        mongodb_uri: str,
+        database_name: str,
+        client: Optional[AsyncMongoClient] = None,
+    ):
         """
         Initialize the workspace thread store.
 
         Args:
             mongodb_uri: MongoDB connection string
             database_name: Name of the database to use
+            client: Shared MongoDB client. If None, the store creates and
+                closes its own.
         """
-        self.client = AsyncMongoClient(mongodb_uri)
+        self._owns_client = client is None
+        self.client = client if client is not None else AsyncMongoClient(mongodb_uri)
         self.db = self.client[database_name]
         self.threads = self.db["workspace_threads"]
         self.messages = self.db["workspace_messages"]
@@ -37,8 +56,11 @@ class WorkspaceThreadStore:
         await self.threads.create_index(
             [("created_at", DESCENDING), ("is_active", ASCENDING)]
         )
-        await self.threads.create_index("workspace_id")
+        await self.threads.create_index(
+            [("workspace_id", ASCENDING), ("_id", DESCENDING)]
+        )
         await self.threads.create_index("execution_environment")
+        await self._drop_legacy_thread_indexes()
 
         # Message indexes
         await self.messages.create_index(
@@ -53,6 +75,16 @@ class WorkspaceThreadStore:
             [("claude_session_id", ASCENDING), ("line_number", ASCENDING)], unique=True
         )
 
+    async def _drop_legacy_thread_indexes(self):
+        """Drop thread indexes no query uses any more (they only slow writes)."""
+        for index_name in LEGACY_THREAD_INDEXES:
+            try:
+                await self.threads.drop_index(index_name)
+            except OperationFailure as e:
+                # Already dropped, or the collection does not exist yet
+                if e.code not in (26, 27):
+                    raise
+
     async def create_thread(self, thread: WorkspaceThread) -> WorkspaceThread:
         """
         Create a new workspace thread in the database.
@@ -105,26 +137,30 @@ class WorkspaceThreadStore:
         return result.modified_count > 0
 
     async def list_threads(
-        self, workspace_id: str, limit: int = 20, skip: int = 0
+        self,
+        workspace_id: str,
+        limit: int = 20,
+        skip: int = 0,
+        after_id: Optional[str] = None,
     ) -> list[WorkspaceThread]:
         """
-        List workspace threads for a specific workspace.
+        List workspace threads for a specific workspace, newest first.
 
         Args:
             workspace_id: The workspace ID to filter threads
             limit: Maximum number of threads to return
-            skip: Number of threads to skip (for pagination)
+            skip: Number of threads to skip (deprecated, use after_id)
+            after_id: Return threads older than this thread's _id (keyset cursor)
 
         Returns:
             List of WorkspaceThread objects
         """
-        query = {"workspace_id": workspace_id, "is_active": True}
+        query: dict = {"workspace_id": workspace_id, "is_active": True}
+        if after_id:
+            query["_id"] = {"$lt": ObjectId(after_id)}
 
         cursor = (
-            self.threads.find(query)
-            .sort("created_at", DESCENDING)
-            .skip(skip)
-            .limit(limit)
+            self.threads.find(query).sort("_id", DESCENDING).skip(skip).limit(limit)
         )
 
         threads = []
@@ -154,6 +190,65 @@ class WorkspaceThreadStore:
         result = await self.threads.delete_one({"claude_session_id": claude_session_id})
         return result.deleted_count > 0
 
+    async def delete_thread_in_workspace(
+        self, workspace_id: str, claude_session_id: str
+    ) -> Optional[str]:
+        """
+        Delete a thread only if it belongs to the given workspace.
+
+        The ownership check and the delete happen in one conditional
+        find_one_and_delete, so there is no separate lookup round-trip.
+
+        Args:
+            workspace_id: The workspace ID the thread must belong to
+            claude_session_id: The Claude session ID
+
+        Returns:
+            The deleted thread's execution_environment, or None if no matching
+            thread was found
+        """
+        doc = await self.threads.find_one_and_delete(
+            {"claude_session_id": claude_session_id, "workspace_id": workspace_id},
+            projection={"execution_environment": 1},
+        )
+        if not doc:
+            return None
+
+        # Delete all messages and JSONL lines for the removed thread
+        await self.messages.delete_many({"claude_session_id": claude_session_id})
+        await self.delete_jsonl_lines(claude_session_id)
+
+        return doc["execution_environment"]
+
+    async def get_thread_with_messages(
+        self, workspace_id: str, claude_session_id: str
+    ) -> Optional[tuple[WorkspaceThread, list[WorkspaceMessage]]]:
+        """
+        Get a workspace thread and its messages.
+
+        The thread and its messages are fetched concurrently. Messages come
+        from their own sorted query rather than being embedded in the thread
+        document, so a long thread is not limited to 16 MB in total.
+
+        Args:
+            workspace_id: The workspace ID the thread must belong to
+            claude_session_id: The Claude session ID
+
+        Returns:
+            Tuple of (thread, messages sorted by sequence) if found, None otherwise
+        """
+        doc, messages = await asyncio.gather(
+            self.threads.find_one(
+                {"claude_session_id": claude_session_id, "workspace_id": workspace_id}
+            ),
+            self.get_thread_messages(claude_session_id),
+        )
+        if not doc:
+            return None
+
+        doc["_id"] = str(doc["_id"])
+        return WorkspaceThread(**doc), messages
+
     async def save_message(self, message: WorkspaceMessage) -> str:
         """
         Save a complete message to the database.
@@ -191,23 +286,60 @@ class WorkspaceThreadStore:
 
         return messages
 
-    async def get_next_sequence(self, claude_session_id: str) -> int:
+    async def get_next_sequence(self, claude_session_id: str, count: int = 1) -> int:
         """
-        Get the next sequence number for a thread.
+        Reserve the next sequence number(s) for a thread.
+
+        Sequences come from an atomic ``next_seq`` counter on the thread
+        document, so concurrent callers never receive the same number. New
+        threads are created with the counter; an older thread without one is
+        seeded once from its last stored message.
 
         Args:
             claude_session_id: The Claude session ID
+            count: How many consecutive sequence numbers to reserve
 
         Returns:
-            The next available sequence number (0 if no messages exist)
+            The first reserved sequence number (0 if no messages exist)
         """
-        last_message = await self.messages.find_one(
-            {"claude_session_id": claude_session_id}, sort=[("sequence", DESCENDING)]
+        doc = await self.threads.find_one_and_update(
+            {"claude_session_id": claude_session_id, "next_seq": {"$exists": True}},
+            {"$inc": {"next_seq": count}},
+            projection={"next_seq": 1, "_id": 0},
+            return_document=ReturnDocument.AFTER,
         )
+        if doc:
+            return doc["next_seq"] - count
 
-        if last_message:
-            return last_message["sequence"] + 1
-        return 0
+        # No counter yet: seed it past the last stored message ($max keeps a
+        # concurrently seeded counter from moving backwards). The projection
+        # and hint make this a covered read of one (claude_session_id, sequence) index
+        # key, with no document fetch
+        last_message = await self.messages.find_one(
+            {"claude_session_id": claude_session_id},
+            sort=[("sequence", DESCENDING)],
+            projection={"sequence": 1, "_id": 0},
+            hint=[("claude_session_id", ASCENDING), ("sequence", ASCENDING)],
+        )
+        start = last_message["sequence"] + 1 if last_message else 0
+        doc = await self.threads.find_one_and_update(
+            {"claude_session_id": claude_session_id},
+            [
+                {
+                    "$set": {
+                        "next_seq": {
+                            "$add": [
+                                {"$max": [{"$ifNull": ["$next_seq", 0]}, start]},
+                                count,
+                            ]
+                        }
+                    }
+                }
+            ],
+            projection={"next_seq": 1, "_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+        return doc["next_seq"] - count if doc else start
 
     async def increment_message_count(self, claude_session_id: str):
         """
@@ -221,6 +353,54 @@ class WorkspaceThreadStore:
             {"$inc": {"message_count": 1}, "$set": {"updated_at": datetime.now(UTC)}},
         )
 
+    async def save_turn(
+        self,
+        claude_session_id: str,
+        user_msg: WorkspaceMessage,
+        assistant_msg: WorkspaceMessage,
+        cost_usd: Optional[float] = None,
+        input_tokens: Optional[int] = None,
+        output_tokens: Optional[int] = None,
+    ):
+        """
+        Save a complete user/assistant turn.
+
+        Inserts both messages with a single insert_many and folds the message
+        count and usage updates into one thread update, instead of separate
+        save_message, increment_message_count and update_thread_usage calls.
+        The thread is only updated once the insert has succeeded, so its
+        counters never count messages that were not stored.
+
+        Args:
+            claude_session_id: The Claude session ID
+            user_msg: The user message of the turn
+            assistant_msg: The assistant message of the turn
+            cost_usd: Thread cost reported by the SDK, if any
+            input_tokens: Input tokens to add to total, if any
+            output_tokens: Output tokens to add to total, if any
+        """
+        inc: dict = {"message_count": 2}
+        set_fields: dict = {"updated_at": datetime.now(UTC)}
+        if (
+            cost_usd is not None
+            or input_tokens is not None
+            or output_tokens is not None
+        ):
+            inc["total_input_tokens"] = input_tokens or 0
+            inc["total_output_tokens"] = output_tokens or 0
+            set_fields["total_cost_usd"] = cost_usd or 0.0
+
+        await self.messages.insert_many(
+            [
+                msg.model_dump(by_alias=True, exclude={"id"})
+                for msg in (user_msg, assistant_msg)
+            ]
+        )
+        await self.threads.update_one(
+            {"claude_session_id": claude_session_id},
+            {"$inc": inc, "$set": set_fields},
+        )
+
     async def update_thread_usage(
         self,
         claude_session_id: str,
@@ -252,17 +432,33 @@ class WorkspaceThreadStore:
         """
         Save JSONL lines for a thread.
 
-        Deletes existing lines for the thread and inserts new ones.
+        JSONL files only ever grow, so when the stored lines are a prefix of
+        ``lines`` only the new tail is inserted. Otherwise the existing lines
+        are replaced.
 
         Args:
             claude_session_id: The Claude session ID
             lines: List of raw JSONL line strings
         """
-        # Delete existing lines for this thread
-        await self.jsonl_lines.delete_many({"claude_session_id": claude_session_id})
+        # Find the last stored line (line numbers are contiguous from 0)
+        last = await self.jsonl_lines.find_one(
+            {"claude_session_id": claude_session_id},
+            sort=[("line_number", DESCENDING)],
+            projection={"line_number": 1, "line": 1},
+        )
 
-        # If no lines to save, we're done
-        if not lines:
+        start = 0
+        if last is not None:
+            start = last["line_number"] + 1
+            if start > len(lines) or lines[start - 1] != last["line"]:
+                # Stored lines diverged from the file; rewrite them all
+                await self.jsonl_lines.delete_many(
+                    {"claude_session_id": claude_session_id}
+                )
+                start = 0
+
+        # If no new lines to save, we're done
+        if start >= len(lines):
             return
 
         # Prepare documents with line numbers
@@ -270,13 +466,13 @@ class WorkspaceThreadStore:
             {
                 "claude_session_id": claude_session_id,
                 "line_number": i,
-                "line": line,
+                "line": lines[i],
             }
-            for i, line in enumerate(lines)
+            for i in range(start, len(lines))
         ]
 
         # Bulk insert
-        await self.jsonl_lines.insert_many(documents)
+        await self.jsonl_lines.insert_many(documents, ordered=False)
 
     async def get_jsonl_lines(self, claude_session_id: str) -> list[str]:
         """
@@ -298,6 +494,30 @@ class WorkspaceThreadStore:
 
         return lines
 
+    async def stream_jsonl_lines(
+        self, claude_session_id: str
+    ) -> AsyncGenerator[str, None]:
+        """
+        Stream JSONL lines for a thread in order without materializing them.
+
+        Args:
+            claude_session_id: The Claude session ID
+
+        Yields:
+            Raw JSONL line strings sorted by line_number
+        """
+        cursor = (
+            self.jsonl_lines.find(
+                {"claude_session_id": claude_session_id},
+                projection={"line": 1, "_id": 0},
+            )
+            .sort("line_number", ASCENDING)
+            .batch_size(JSONL_READ_BATCH_SIZE)
+        )
+
+        async for doc in cursor:
+            yield doc["line"]
+
     async def delete_jsonl_lines(self, claude_session_id: str):
         """
         Delete all JSONL lines for a thread.
@@ -385,5 +605,6 @@ class WorkspaceThreadStore:
         return thread.files if thread else []
 
     async def close(self):
-        """Close the MongoDB connection."""
-        await self.client.close()
+        """Close the MongoDB connection if this store owns it."""
+        if self._owns_client:
+            await self.client.close()
@@ -1,9 +1,9 @@
 import asyncio
 
-from claude_agent_sdk import ClaudeAgentOptions, ClaudeSDKClient
+from claude_agent_sdk import ClaudeAgentOptions
 
 from metropolis.tools.skill_tool import _skill_db as skill_db
-from metropolis.utils.partial_messages import StreamPrintHandler
+from metropolis.utils.repl import run, run_repl
 
 
 def get_skills():
@@ -32,22 +32,8 @@ options = ClaudeAgentOptions(
 
 
 async def main():
-    async with ClaudeSDKClient(options=options) as client:
-        print_handler = StreamPrintHandler(use_colors=True)
-
-        while True:
-            prompt = input("You: ")
-            if prompt == "exit":
-                break
-
-            await client.query(prompt)
-
-            # Process response - handles all message types
-            async for message in client.receive_response():
-                print_handler.process_message(message)
-
-            print_handler.finalize()
+    await run_repl(options)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main())
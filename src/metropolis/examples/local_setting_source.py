@@ -1,10 +1,8 @@
-import asyncio
-
-from claude_agent_sdk import ClaudeAgentOptions, ClaudeSDKClient, HookMatcher
+from claude_agent_sdk import ClaudeAgentOptions, HookMatcher
 
 from metropolis.hooks import validate_deck_on_write
 from metropolis.tools.test_tool import multiplication_server
-from metropolis.utils.partial_messages import StreamPrintHandler
+from metropolis.utils.repl import run, run_repl
 
 options = ClaudeAgentOptions(
     include_partial_messages=True,
@@ -21,22 +19,8 @@ options = ClaudeAgentOptions(
 
 
 async def main():
-    async with ClaudeSDKClient(options=options) as client:
-        print_handler = StreamPrintHandler(use_colors=True)
-
-        while True:
-            prompt = input("You: ")
-            if prompt == "exit":
-                break
-
-            await client.query(prompt)
-
-            # Process response - handles all message types
-            async for message in client.receive_response():
-                print_handler.process_message(message)
-
-            print_handler.finalize()
+    await run_repl(options)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main())
@@ -1,12 +1,11 @@
-import asyncio
 import shutil
 import tempfile
 from pathlib import Path
 
-from claude_agent_sdk import ClaudeAgentOptions, ClaudeSDKClient
+from claude_agent_sdk import ClaudeAgentOptions
 
 from metropolis.tools.skill_tool import skill_server
-from metropolis.utils.partial_messages import StreamPrintHandler
+from metropolis.utils.repl import run, run_repl
 
 artifact_folder = Path("/home/vkieuvongngam/exploration/metropolis/artifacts")
 parent_dir = Path("/home/vkieuvongngam/exploration/metropolis/temp_folder")
@@ -99,29 +98,17 @@ def copy_artifacts_from_temp_folder(temp_path: Path, artifact_folder: Path):
 
 
 async def main():
-    async with ClaudeSDKClient(options=options) as client:
-        print_handler = StreamPrintHandler(use_colors=True)
+    def copy_artifacts():
+        # Copy artifacts after every turn
+        copy_artifacts_from_temp_folder(temp_path, artifact_folder)
 
-        while True:
-            prompt = input("You: ")
-            if prompt == "exit":
-                # Final copy of artifacts before cleanup
-                copy_artifacts_from_temp_folder(temp_path, artifact_folder)
-                # remove the temp folder
-                shutil.rmtree(temp_path)
-                break
+    def clean_up():
+        # Final copy of artifacts before cleanup, then remove the temp folder
+        copy_artifacts()
+        shutil.rmtree(temp_path)
 
-            await client.query(prompt)
-
-            # Process response - handles all message types
-            async for message in client.receive_response():
-                print_handler.process_message(message)
-
-            print_handler.finalize()
-
-            # Copy artifacts after every turn
-            copy_artifacts_from_temp_folder(temp_path, artifact_folder)
+    await run_repl(options, after_turn=copy_artifacts, on_exit=clean_up)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main())
@@ -1,13 +1,12 @@
-import asyncio
 import shutil
 from pathlib import Path
 
 from bson import ObjectId
-from claude_agent_sdk import AgentDefinition, ClaudeAgentOptions, ClaudeSDKClient
+from claude_agent_sdk import AgentDefinition, ClaudeAgentOptions
 
 from metropolis.dependencies.temp_folder import TempFolderManager
 from metropolis.utils.artifact_handler import copy_artifacts_from_temp_folder
-from metropolis.utils.partial_messages import StreamPrintHandler
+from metropolis.utils.repl import run, run_repl
 
 
 def get_agent_options(temp_path: Path):
@@ -80,30 +79,18 @@ async def main():
     temp_path = temp_folder_manager.create_temp_folder()
     run_id = str(ObjectId())
     options = get_agent_options(temp_path)
-    async with ClaudeSDKClient(options=options) as client:
-        print_handler = StreamPrintHandler(use_colors=True)
 
-        while True:
-            prompt = input("You: ")
-            if prompt == "exit":
-                # Final copy of artifacts before cleanup
-                copy_artifacts_from_temp_folder(temp_path, run_id)
-                # remove the temp folder
-                shutil.rmtree(temp_path)
-                break
+    def copy_artifacts():
+        # Copy artifacts after every turn
+        copy_artifacts_from_temp_folder(temp_path, run_id)
 
-            await client.query(prompt)
+    def clean_up():
+        # Final copy of artifacts before cleanup, then remove the temp folder
+        copy_artifacts()
+        shutil.rmtree(temp_path)
 
-            # Process response - handles all message types
-            async for message in client.receive_response():
-                # print(message)
-                print_handler.process_message(message)
-
-            print_handler.finalize()
-
-            # Copy artifacts after every turn
-            copy_artifacts_from_temp_folder(temp_path, run_id)
+    await run_repl(options, after_turn=copy_artifacts, on_exit=clean_up)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main())
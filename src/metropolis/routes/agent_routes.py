@@ -1,13 +1,34 @@
 import json
+import traceback
+from contextlib import aclosing
 from typing import Optional
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
 
+from metropolis.config.settings import server_config
+from metropolis.db.models import ClaudeAgentMessage
 from metropolis.services.agent_manager import get_agent_manager
+from metropolis.utils.json_encoding import encode_json
 
 router = APIRouter()
 
+# Largest client message (in UTF-8 bytes) accepted before the socket is closed
+# with 1009 (message too big); prompts are the only large client messages.
+# The server launchers pass the same limit as uvicorn's ws_max_size, which
+# bounds what is buffered before this check runs.
+MAX_CLIENT_MESSAGE_BYTES = server_config.max_client_message_bytes
+
+# Message list serializer built once, so history is dumped in a single call
+_MESSAGES_ADAPTER = TypeAdapter(list[ClaudeAgentMessage])
+
+# Constant error frames, encoded once
+_NO_SESSION_FRAME = encode_json({"type": "error", "message": "No session initialized"})
+_INIT_REQUIRES_SESSION_ID_FRAME = encode_json(
+    {"type": "error", "message": "init_session requires claude_session_id"}
+)
+
 
 @router.websocket("/ws/agent")
 async def websocket_agent_endpoint(websocket: WebSocket):
@@ -29,11 +50,21 @@ async def websocket_agent_endpoint(websocket: WebSocket):
 
     try:
         while True:
-            # Receive message from client
+            # Receive message from client; refuse oversized frames before
+            # parsing them
             data = await websocket.receive_text()
+            # A str never has more characters than UTF-8 bytes, and at most
+            # 4 bytes per character, so only encode when the bound is unclear
+            if len(data) > MAX_CLIENT_MESSAGE_BYTES or (
+                len(data) * 4 > MAX_CLIENT_MESSAGE_BYTES
+                and len(data.encode()) > MAX_CLIENT_MESSAGE_BYTES
+            ):
+                await websocket.close(code=1009, reason="Message too big")
+                return
             message_data = json.loads(data)
+            message_type = message_data.get("type")
 
-            if message_data.get("type") == "init_session":
+            if message_type == "init_session":
                 # Resume existing session
                 requested_session_id = message_data.get("claude_session_id")
 
@@ -47,30 +78,19 @@ async def websocket_agent_endpoint(websocket: WebSocket):
                         claude_session_id
                     )
 
+                    # History is encoded straight to JSON by pydantic and
+                    # spliced into the envelope, not rebuilt as dicts first
+                    messages_json = _MESSAGES_ADAPTER.dump_json(messages).decode()
                     await websocket.send_text(
-                        json.dumps(
-                            {
-                                "type": "session_ready",
-                                "claude_session_id": claude_session_id,
-                                "messages": [
-                                    msg.model_dump(mode="json") for msg in messages
-                                ],
-                            },
-                            default=str,
-                        )
+                        '{"type":"session_ready","claude_session_id":'
+                        f"{encode_json(claude_session_id)},"
+                        f'"messages":{messages_json}}}'
                     )
                 else:
                     # Invalid - init_session requires session_id
-                    await websocket.send_text(
-                        json.dumps(
-                            {
-                                "type": "error",
-                                "message": "init_session requires claude_session_id",
-                            }
-                        )
-                    )
+                    await websocket.send_text(_INIT_REQUIRES_SESSION_ID_FRAME)
 
-            elif message_data.get("type") == "query":
+            elif message_type == "query":
                 prompt = message_data.get("content", "")
                 session_id_in_message = message_data.get("session_id")
 
@@ -82,22 +102,24 @@ async def websocket_agent_endpoint(websocket: WebSocket):
                         response_gen,
                     ) = await agent_manager.create_session_with_first_query(prompt)
 
-                    # Stream the response
-                    async for response_msg in response_gen:
-                        await websocket.send_text(json.dumps(response_msg))
-
-                        # Capture session ID when it's emitted
-                        if response_msg.get("type") == "session_id_captured":
-                            claude_session_id = response_msg.get("session_id")
-                            # Notify frontend of the real session ID
-                            await websocket.send_text(
-                                json.dumps(
-                                    {
-                                        "type": "session_created",
-                                        "session_id": claude_session_id,
-                                    }
+                    # Stream the response (aclosing runs the generator's
+                    # persistence promptly if the socket drops mid-stream)
+                    async with aclosing(response_gen):
+                        async for response_msg in response_gen:
+                            await websocket.send_text(encode_json(response_msg))
+
+                            # Capture session ID when it's emitted
+                            if response_msg.get("type") == "session_id_captured":
+                                claude_session_id = response_msg.get("session_id")
+                                # Notify frontend of the real session ID
+                                await websocket.send_text(
+                                    encode_json(
+                                        {
+                                            "type": "session_created",
+                                            "session_id": claude_session_id,
+                                        }
+                                    )
                                 )
-                            )
 
                 elif claude_session_id or session_id_in_message:
                     # Subsequent query - use existing session
@@ -105,34 +127,27 @@ async def websocket_agent_endpoint(websocket: WebSocket):
                         claude_session_id = session_id_in_message
 
                     if not claude_session_id:
-                        await websocket.send_text(
-                            json.dumps(
-                                {"type": "error", "message": "No session initialized"}
-                            )
-                        )
+                        await websocket.send_text(_NO_SESSION_FRAME)
                         continue
 
                     # Stream with persistence
-                    async for response_msg in agent_manager.send_query_with_persistence(
-                        claude_session_id, prompt, websocket
-                    ):
-                        await websocket.send_text(json.dumps(response_msg))
-                else:
-                    await websocket.send_text(
-                        json.dumps(
-                            {"type": "error", "message": "No session initialized"}
+                    async with aclosing(
+                        agent_manager.send_query_with_persistence(
+                            claude_session_id, prompt, websocket
                         )
-                    )
+                    ) as response_gen:
+                        async for response_msg in response_gen:
+                            await websocket.send_text(encode_json(response_msg))
+                else:
+                    await websocket.send_text(_NO_SESSION_FRAME)
 
     except WebSocketDisconnect:
         print(f"WebSocket disconnected for session {claude_session_id}")
     except Exception as e:
         print(f"WebSocket error: {e}")
-        import traceback
-
         traceback.print_exc()
         try:
-            error_msg = json.dumps({"type": "error", "message": str(e)})
+            error_msg = encode_json({"type": "error", "message": str(e)})
             await websocket.send_text(error_msg)
         except Exception as send_error:
             print(f"Failed to send error message: {send_error}")
@@ -140,10 +155,7 @@ async def websocket_agent_endpoint(websocket: WebSocket):
         # Persist JSONL to MongoDB when WebSocket disconnects
         if claude_session_id:
             try:
-                from metropolis.services.jsonl_handler import JSONLHandler
-
-                jsonl_handler = JSONLHandler()
-                await jsonl_handler.persist_to_mongodb(
+                await agent_manager.jsonl_handler.persist_to_mongodb(
                     claude_session_id, agent_manager.session_store
                 )
                 print(f"Persisted JSONL for session {claude_session_id} to MongoDB")
@@ -3,12 +3,19 @@
 from datetime import UTC, datetime
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
 
-from metropolis.db.models import SessionMetadata
+from metropolis.db.models import ClaudeAgentMessage, ClaudeAgentSession, SessionMetadata
 from metropolis.db.session_store import SessionStore
 
 router = APIRouter(prefix="/api/sessions", tags=["sessions"])
 
+# Serializers built once: the session list is dumped in a single call, and
+# streamed messages are encoded straight to JSON bytes
+_SESSIONS_ADAPTER = TypeAdapter(list[ClaudeAgentSession])
+_MESSAGE_ADAPTER = TypeAdapter(ClaudeAgentMessage)
+
 # Global session store instance
 _session_store: SessionStore | None = None
 
@@ -43,7 +50,7 @@ async def list_sessions(limit: int = 20, skip: int = 0):
     """
     session_store = get_session_store()
     sessions = await session_store.list_sessions(limit=limit, skip=skip)
-    return {"sessions": [s.model_dump() for s in sessions]}
+    return {"sessions": _SESSIONS_ADAPTER.dump_python(sessions, mode="json")}
 
 
 @router.get("/{claude_session_id}")
@@ -55,7 +62,7 @@ async def get_session_detail(claude_session_id: str):
         claude_session_id: The Claude Agent SDK session ID
 
     Returns:
-        Dictionary with session and messages
+        JSON document with session and messages, streamed as messages are read
 
     Raises:
         HTTPException: 404 if session not found
@@ -65,12 +72,17 @@ async def get_session_detail(claude_session_id: str):
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    messages = await session_store.get_session_messages(claude_session_id)
-
-    return {
-        "session": session.model_dump(),
-        "messages": [m.model_dump() for m in messages],
-    }
+    async def body():
+        # Same document as before, written incrementally: each message is
+        # encoded as it comes off the cursor instead of after loading them all
+        yield b'{"session":' + session.model_dump_json().encode() + b',"messages":['
+        separator = b""
+        async for message in session_store.stream_session_messages(claude_session_id):
+            yield separator + _MESSAGE_ADAPTER.dump_json(message)
+            separator = b","
+        yield b"]}"
+
+    return StreamingResponse(body(), media_type="application/json")
 
 
 @router.delete("/{claude_session_id}")
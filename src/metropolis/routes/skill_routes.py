@@ -5,6 +5,7 @@ from pydantic import BaseModel
 
 from metropolis.db.models import ClaudeAgentSkill
 from metropolis.db.skill_store import SkillStore
+from metropolis.tools.skill_tool import invalidate_skill_cache
 
 router = APIRouter(prefix="/api/skills", tags=["skills"])
 
@@ -57,6 +58,8 @@ async def create_skill(request: CreateSkillRequest):
         content=request.content,
     )
     created_skill = await skill_store.create_skill(skill)
+    # Let the skill tools' cached listings pick up the new skill
+    invalidate_skill_cache(created_skill.id)
     return created_skill.model_dump(by_alias=True)
 
 
@@ -116,16 +119,13 @@ async def update_skill(skill_id: str, request: UpdateSkillRequest):
     skill_store = get_skill_store()
 
     # Build update dict with only provided fields
-    updates = {}
-    if request.title is not None:
-        updates["title"] = request.title
-    if request.content is not None:
-        updates["content"] = request.content
+    updates = request.model_dump(exclude_unset=True, exclude_none=True)
 
     if not updates:
         raise HTTPException(status_code=400, detail="No fields to update")
 
     success = await skill_store.update_skill(skill_id, updates)
+    invalidate_skill_cache(skill_id)
     if not success:
         raise HTTPException(status_code=404, detail="Skill not found")
     return {"success": True}
@@ -147,6 +147,7 @@ async def delete_skill(skill_id: str):
     """
     skill_store = get_skill_store()
     success = await skill_store.delete_skill(skill_id)
+    invalidate_skill_cache(skill_id)
     if not success:
         raise HTTPException(status_code=404, detail="Skill not found")
     return {"success": True}
@@ -1,5 +1,6 @@
 """REST API endpoints for workflow management."""
 
+from contextlib import aclosing
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, HTTPException
@@ -10,6 +11,7 @@ from metropolis.db.skill_store import SkillStore
 from metropolis.db.workflow_store import WorkflowStore
 from metropolis.dependencies.temp_folder import get_temp_folder
 from metropolis.services.workflow_service import WorkflowService
+from metropolis.utils.sse import SSE_HEADERS, SSE_MEDIA_TYPE, coalesce_sse
 
 router = APIRouter(prefix="/api", tags=["workflows"])
 
@@ -134,18 +136,20 @@ async def execute_workflow(
 
     # Execute workflow and stream results
     async def generate():
-        async for event in workflow_service.execute_workflow(
-            skill_id, request.user_input, temp_path
-        ):
-            yield event
+        # aclosing closes the service stream as soon as this one is closed;
+        # coalesce_sse merges frames that queue up behind a slow socket
+        async with aclosing(
+            coalesce_sse(
+                workflow_service.execute_workflow(
+                    skill_id, request.user_input, temp_path
+                )
+            )
+        ) as events:
+            async for event in events:
+                yield event
 
     return StreamingResponse(
         generate(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "*",
-        },
+        media_type=SSE_MEDIA_TYPE,
+        headers=SSE_HEADERS,
     )
@@ -1,11 +1,22 @@
 """REST API endpoints for workspace and thread management."""
 
-from typing import List, Optional
-
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
-from fastapi.responses import FileResponse, StreamingResponse
+from contextlib import aclosing
+from typing import Annotated, List, Optional
+
+from bson import ObjectId
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    File,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+)
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
+from metropolis.db.models import Workspace
 from metropolis.db.skill_store import SkillStore
 from metropolis.db.workspace_store import WorkspaceStore
 from metropolis.db.workspace_thread_store import WorkspaceThreadStore
@@ -14,6 +25,7 @@ from metropolis.dependencies.workspace_folder import (
 )
 from metropolis.services.file_service import FileService
 from metropolis.services.workspace_service import WorkspaceService
+from metropolis.utils.sse import SSE_HEADERS, SSE_MEDIA_TYPE, coalesce_sse
 
 router = APIRouter(prefix="/api", tags=["workspaces"])
 
@@ -22,6 +34,7 @@ _workspace_store: WorkspaceStore | None = None
 _workspace_thread_store: WorkspaceThreadStore | None = None
 _skill_store: SkillStore | None = None
 _file_service: FileService | None = None
+_workspace_service: WorkspaceService | None = None
 
 
 def get_workspace_store() -> WorkspaceStore:
@@ -84,6 +97,39 @@ def init_file_service(file_service: FileService):
     _file_service = file_service
 
 
+def get_workspace_service() -> WorkspaceService:
+    """
+    Get the global workspace service instance, creating it on first use.
+
+    The service is shared across requests so per-thread state, such as
+    in-flight background JSONL persists, survives between chat turns.
+    """
+    global _workspace_service
+    if _workspace_service is None:
+        _workspace_service = WorkspaceService(
+            get_workspace_store(), get_workspace_thread_store(), get_skill_store()
+        )
+    return _workspace_service
+
+
+async def close_workspace_service():
+    """Wait for the workspace service's background writes, if it was created."""
+    if _workspace_service is not None:
+        await _workspace_service.wait_for_pending_persists()
+
+
+def _set_next_cursor(response: Response, items: list, limit: int):
+    """Expose the keyset cursor for the next page via the X-Next-Cursor header."""
+    if limit > 0 and len(items) == limit:
+        response.headers["X-Next-Cursor"] = str(items[-1].id)
+
+
+def _validate_cursor(cursor: Optional[str]):
+    """Reject cursors that are not valid ObjectIds."""
+    if cursor is not None and not ObjectId.is_valid(cursor):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 class CreateWorkspaceRequest(BaseModel):
     """Request model for creating a workspace."""
 
@@ -114,22 +160,38 @@ class ChatRequest(BaseModel):
 
 @router.get("/workspaces")
 async def list_workspaces(
+    response: Response,
     limit: int = 12,
     skip: int = 0,
-    workspace_store: WorkspaceStore = Depends(get_workspace_store),
+    cursor: Optional[str] = None,
+    include: Annotated[Optional[List[str]], Query()] = None,
 ):
     """
     List all workspaces with pagination.
 
+    When a full page is returned, the X-Next-Cursor response header holds
+    the cursor for the next page.
+
     Args:
+        response: Outgoing response (for the X-Next-Cursor header)
         limit: Maximum number of workspaces to return
-        skip: Number of workspaces to skip (for pagination)
-        workspace_store: Injected workspace store
+        skip: Number of workspaces to skip (deprecated, use cursor)
+        cursor: Keyset cursor from a previous X-Next-Cursor header
+        include: Optional related data to embed; pass ``include=skills`` to
+            add a ``skills`` list (id and title) to each workspace
 
     Returns:
         List of workspaces
     """
-    workspaces = await workspace_store.list_workspaces(limit=limit, skip=skip)
+    workspace_store = get_workspace_store()
+    _validate_cursor(cursor)
+    workspaces = await workspace_store.list_workspaces(
+        limit=limit, skip=skip, after_id=cursor
+    )
+    _set_next_cursor(response, workspaces, limit)
+
+    if not include or "skills" not in include:
+        return [workspace.model_dump(by_alias=True) for workspace in workspaces]
 
     # Get skills for each workspace
     skill_store = get_skill_store()
@@ -158,20 +220,17 @@ async def list_workspaces(
 @router.post("/workspaces")
 async def create_workspace(
     request: CreateWorkspaceRequest,
-    workspace_store: WorkspaceStore = Depends(get_workspace_store),
 ):
     """
     Create a new workspace.
 
     Args:
         request: Workspace creation request
-        workspace_store: Injected workspace store
 
     Returns:
         The created workspace
     """
-    from metropolis.db.models import Workspace
-
+    workspace_store = get_workspace_store()
     workspace = Workspace(
         name=request.name,
         description=request.description,
@@ -184,26 +243,30 @@ async def create_workspace(
 
 @router.get("/workspaces/{workspace_id}")
 async def get_workspace(
-    workspace_id: str, workspace_store: WorkspaceStore = Depends(get_workspace_store)
+    workspace_id: str, include: Annotated[Optional[List[str]], Query()] = None
 ):
     """
-    Get a workspace by ID with skill details.
+    Get a workspace by ID, optionally with skill details.
 
     Args:
         workspace_id: The workspace ID
-        workspace_store: Injected workspace store
+        include: Optional related data to embed; pass ``include=skills`` to
+            add the full ``skills`` documents to the response
 
     Returns:
-        The workspace details with skills
+        The workspace details (with skills if requested)
 
     Raises:
         HTTPException: If workspace not found
     """
+    workspace_store = get_workspace_store()
     workspace = await workspace_store.get_workspace(workspace_id)
     if not workspace:
         raise HTTPException(status_code=404, detail="Workspace not found")
 
     workspace_dict = workspace.model_dump(by_alias=True)
+    if not include or "skills" not in include:
+        return workspace_dict
 
     # Load skill details
     skill_store = get_skill_store()
@@ -221,7 +284,6 @@ async def get_workspace(
 async def update_workspace(
     workspace_id: str,
     request: UpdateWorkspaceRequest,
-    workspace_store: WorkspaceStore = Depends(get_workspace_store),
 ):
     """
     Update a workspace.
@@ -229,7 +291,6 @@ async def update_workspace(
     Args:
         workspace_id: The workspace ID
         request: Workspace update request
-        workspace_store: Injected workspace store
 
     Returns:
         Success status
@@ -237,31 +298,24 @@ async def update_workspace(
     Raises:
         HTTPException: If workspace not found
     """
-    updates = {}
-    if request.name is not None:
-        updates["name"] = request.name
-    if request.description is not None:
-        updates["description"] = request.description
-    if request.skill_ids is not None:
-        updates["skill_ids"] = request.skill_ids
-
-    success = await workspace_store.update_workspace(workspace_id, updates)
-    if not success:
+    workspace_store = get_workspace_store()
+    # Only forward fields the client actually sent
+    updates = request.model_dump(exclude_unset=True, exclude_none=True)
+
+    matched = await workspace_store.update_workspace(workspace_id, updates)
+    if not matched:
         raise HTTPException(status_code=404, detail="Workspace not found")
 
     return {"success": True}
 
 
 @router.delete("/workspaces/{workspace_id}")
-async def delete_workspace(
-    workspace_id: str, workspace_store: WorkspaceStore = Depends(get_workspace_store)
-):
+async def delete_workspace(workspace_id: str):
     """
     Delete a workspace.
 
     Args:
         workspace_id: The workspace ID
-        workspace_store: Injected workspace store
 
     Returns:
         Success status
@@ -269,6 +323,7 @@ async def delete_workspace(
     Raises:
         HTTPException: If workspace not found
     """
+    workspace_store = get_workspace_store()
     success = await workspace_store.delete_workspace(workspace_id)
     if not success:
         raise HTTPException(status_code=404, detail="Workspace not found")
@@ -279,25 +334,33 @@ async def delete_workspace(
 @router.get("/workspaces/{workspace_id}/threads")
 async def list_workspace_threads(
     workspace_id: str,
+    response: Response,
     limit: int = 20,
     skip: int = 0,
-    workspace_thread_store: WorkspaceThreadStore = Depends(get_workspace_thread_store),
+    cursor: Optional[str] = None,
 ):
     """
     List all threads in a workspace.
 
+    When a full page is returned, the X-Next-Cursor response header holds
+    the cursor for the next page.
+
     Args:
         workspace_id: The workspace ID
+        response: Outgoing response (for the X-Next-Cursor header)
         limit: Maximum number of threads to return
-        skip: Number of threads to skip (for pagination)
-        workspace_thread_store: Injected workspace thread store
+        skip: Number of threads to skip (deprecated, use cursor)
+        cursor: Keyset cursor from a previous X-Next-Cursor header
 
     Returns:
         List of threads
     """
+    workspace_thread_store = get_workspace_thread_store()
+    _validate_cursor(cursor)
     threads = await workspace_thread_store.list_threads(
-        workspace_id=workspace_id, limit=limit, skip=skip
+        workspace_id=workspace_id, limit=limit, skip=skip, after_id=cursor
     )
+    _set_next_cursor(response, threads, limit)
     return [thread.model_dump(by_alias=True) for thread in threads]
 
 
@@ -305,7 +368,6 @@ async def list_workspace_threads(
 async def create_workspace_thread(
     workspace_id: str,
     request: CreateThreadRequest,
-    workspace_store: WorkspaceStore = Depends(get_workspace_store),
 ):
     """
     Create a new thread in a workspace.
@@ -316,7 +378,6 @@ async def create_workspace_thread(
     Args:
         workspace_id: The workspace ID
         request: Thread creation request
-        workspace_store: Injected workspace store
 
     Returns:
         Thread creation status
@@ -324,6 +385,7 @@ async def create_workspace_thread(
     Raises:
         HTTPException: If workspace not found
     """
+    workspace_store = get_workspace_store()
     workspace = await workspace_store.get_workspace(workspace_id)
     if not workspace:
         raise HTTPException(status_code=404, detail="Workspace not found")
@@ -339,7 +401,6 @@ async def create_workspace_thread(
 async def get_workspace_thread(
     workspace_id: str,
     thread_id: str,
-    workspace_thread_store: WorkspaceThreadStore = Depends(get_workspace_thread_store),
 ):
     """
     Get a thread and its messages.
@@ -347,7 +408,6 @@ async def get_workspace_thread(
     Args:
         workspace_id: The workspace ID
         thread_id: The thread ID (claude_session_id)
-        workspace_thread_store: Injected workspace thread store
 
     Returns:
         Thread details with messages
@@ -355,11 +415,14 @@ async def get_workspace_thread(
     Raises:
         HTTPException: If thread not found or doesn't belong to workspace
     """
-    thread = await workspace_thread_store.get_thread(thread_id)
-    if not thread or thread.workspace_id != workspace_id:
+    workspace_thread_store = get_workspace_thread_store()
+    result = await workspace_thread_store.get_thread_with_messages(
+        workspace_id, thread_id
+    )
+    if result is None:
         raise HTTPException(status_code=404, detail="Thread not found")
 
-    messages = await workspace_thread_store.get_thread_messages(thread_id)
+    thread, messages = result
 
     return {
         "session": thread.model_dump(by_alias=True),
@@ -371,15 +434,18 @@ async def get_workspace_thread(
 async def delete_workspace_thread(
     workspace_id: str,
     thread_id: str,
-    workspace_thread_store: WorkspaceThreadStore = Depends(get_workspace_thread_store),
+    background_tasks: BackgroundTasks,
 ):
     """
     Delete a thread from a workspace.
 
+    The execution environment folder is removed in a background task after
+    the response is sent, so large folders don't delay the reply.
+
     Args:
         workspace_id: The workspace ID
         thread_id: The thread ID (claude_session_id)
-        workspace_thread_store: Injected workspace thread store
+        background_tasks: Injected background tasks for folder cleanup
 
     Returns:
         Success status
@@ -387,20 +453,19 @@ async def delete_workspace_thread(
     Raises:
         HTTPException: If thread not found or doesn't belong to workspace
     """
-    thread = await workspace_thread_store.get_thread(thread_id)
-    if not thread or thread.workspace_id != workspace_id:
+    workspace_thread_store = get_workspace_thread_store()
+    # Delete the thread and all its messages, returning its execution environment
+    execution_environment = await workspace_thread_store.delete_thread_in_workspace(
+        workspace_id, thread_id
+    )
+    if execution_environment is None:
         raise HTTPException(status_code=404, detail="Thread not found")
 
-    # Get execution environment before deletion
-    execution_environment = thread.execution_environment
-
-    # Delete the thread and all its messages
-    success = await workspace_thread_store.delete_thread(thread_id)
-    if not success:
-        raise HTTPException(status_code=500, detail="Failed to delete thread")
-
-    # Clean up the execution environment folder
-    cleanup_execution_environment_folder(execution_environment)
+    # Clean up the execution environment folder off the event loop
+    # (sync background tasks run in Starlette's threadpool)
+    background_tasks.add_task(
+        cleanup_execution_environment_folder, execution_environment
+    )
 
     return {"success": True}
 
@@ -422,34 +487,29 @@ async def chat_in_workspace_thread(
     Returns:
         StreamingResponse with Server-Sent Events
     """
-    workspace_store = get_workspace_store()
-    workspace_thread_store = get_workspace_thread_store()
-    skill_store = get_skill_store()
-
-    # Create workspace service
-    workspace_service = WorkspaceService(
-        workspace_store, workspace_thread_store, skill_store
-    )
+    workspace_service = get_workspace_service()
 
     # Handle thread_id - convert "pending" to None
     actual_thread_id = None if thread_id == "pending" else thread_id
 
     # Stream chat (workspace service manages execution environments)
     async def generate():
-        async for event in workspace_service.chat_in_workspace(
-            workspace_id, request.message, actual_thread_id
-        ):
-            yield event
+        # aclosing closes the service stream as soon as this one is closed;
+        # coalesce_sse merges frames that queue up behind a slow socket
+        async with aclosing(
+            coalesce_sse(
+                workspace_service.chat_in_workspace(
+                    workspace_id, request.message, actual_thread_id
+                )
+            )
+        ) as events:
+            async for event in events:
+                yield event
 
     return StreamingResponse(
         generate(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "*",
-        },
+        media_type=SSE_MEDIA_TYPE,
+        headers=SSE_HEADERS,
     )
 
 
@@ -503,14 +563,20 @@ async def list_files(workspace_id: str, thread_id: str):
 
 
 @router.get("/workspaces/{workspace_id}/threads/{thread_id}/files/{filename}")
-async def download_file(workspace_id: str, thread_id: str, filename: str):
+async def download_file(
+    workspace_id: str, thread_id: str, filename: str, request: Request
+):
     """
     Download a file from the thread's execution environment.
 
+    Responses carry ETag/Last-Modified headers; a matching If-None-Match
+    request header gets a 304 without resending the file.
+
     Args:
         workspace_id: The workspace ID
         thread_id: The thread ID (claude_session_id)
         filename: Filename to download
+        request: Incoming request (for conditional headers)
 
     Returns:
         File as download
@@ -518,10 +584,24 @@ async def download_file(workspace_id: str, thread_id: str, filename: str):
     file_service = get_file_service()
 
     try:
-        file_path, mime_type = await file_service.download_file(
+        file_path, mime_type, stat_result = await file_service.download_file(
             workspace_id, thread_id, filename
         )
-        return FileResponse(path=file_path, media_type=mime_type, filename=filename)
+        response = FileResponse(
+            path=file_path,
+            stat_result=stat_result,
+            media_type=mime_type,
+            filename=filename,
+        )
+        if request.headers.get("if-none-match") == response.headers["etag"]:
+            return Response(
+                status_code=304,
+                headers={
+                    "etag": response.headers["etag"],
+                    "last-modified": response.headers["last-modified"],
+                },
+            )
+        return response
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except ValueError as e:
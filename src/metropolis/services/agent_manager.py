@@ -1,16 +1,137 @@
 """Multi-session agent manager for Claude Agent SDK."""
 
-from datetime import UTC, datetime
-from typing import AsyncGenerator, Dict, Optional
+import asyncio
+import dataclasses
+import json
+import time
+from collections import OrderedDict
+from contextlib import aclosing, asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncGenerator, Callable, Coroutine, Dict, Optional
 
 from claude_agent_sdk import ClaudeAgentOptions, ClaudeSDKClient, ResultMessage
 from fastapi import WebSocket
+from watchfiles import Change, awatch
 
 from metropolis.db.models import ClaudeAgentMessage, ClaudeAgentSession, MessageRole
 from metropolis.db.session_store import SessionStore
 from metropolis.services.jsonl_handler import JSONLHandler
+from metropolis.utils.content_blocks import (
+    DELTA_MESSAGE_TYPES,
+    TOOL_MESSAGE_TYPES,
+    ContentBlockBuffer,
+)
 from metropolis.utils.websocket_handler import WebSocketStreamHandler
 
+# How long to wait for the SDK to create a new session JSONL file
+JSONL_WATCH_TIMEOUT_SECONDS = 5.0
+
+# Maximum number of processed messages buffered between the SDK and the socket
+STREAM_QUEUE_SIZE = 64
+
+# Size (in characters) at which queued text/thinking chunks stop being
+# merged into one outgoing message
+STREAM_COALESCE_MAX_CHARS = 4096
+
+# Marks that no message has been taken off the stream queue ahead of time
+_NOTHING_QUEUED = object()
+
+# Maximum number of SDK clients kept alive; least recently used are closed
+MAX_ACTIVE_CLIENTS = 256
+
+# Accumulated content size (in characters) past which further blocks are
+# dropped from the persisted message, and past which the turn is ended early.
+# Both stay below MongoDB's 16 MB document limit.
+ACCUMULATOR_SOFT_LIMIT = 10 * 1024 * 1024
+ACCUMULATOR_HARD_LIMIT = 14 * 1024 * 1024
+
+
+async def _await_new_jsonl(project_path: Path) -> Optional[str]:
+    """
+    Wait for the SDK to create a new session JSONL file.
+
+    Args:
+        project_path: Project directory the SDK writes JSONL files to
+
+    Returns:
+        Stem of the first newly added ``*.jsonl`` file (the session ID)
+    """
+    async for changes in awatch(project_path):
+        for change, path in changes:
+            if change == Change.added and path.endswith(".jsonl"):
+                return Path(path).stem
+    return None
+
+
+class _Accumulator(ContentBlockBuffer):
+    """
+    Buffers streamed content blocks and usage for persistence.
+
+    Blocks are collected by ContentBlockBuffer. Content past
+    ACCUMULATOR_SOFT_LIMIT is replaced by a single ``truncated`` block
+    recording how much was dropped.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.total_size = 0
+        self._truncated: Optional[dict] = None
+        self.session_id: Optional[str] = None
+        self.cost_usd: Optional[float] = None
+        self.input_tokens: Optional[int] = None
+        self.output_tokens: Optional[int] = None
+
+    def add(self, json_msg: dict):
+        """
+        Accumulate a streamed message (same logic as frontend).
+
+        Args:
+            json_msg: JSON message produced by the stream handler
+        """
+        msg_type = json_msg["type"]
+        if msg_type in DELTA_MESSAGE_TYPES:
+            size = len(json_msg["content"])
+        elif msg_type in TOOL_MESSAGE_TYPES:
+            size = len(json.dumps(json_msg, default=str))
+        else:
+            return
+
+        self.total_size += size
+        if self.total_size > ACCUMULATOR_SOFT_LIMIT:
+            if self._truncated is None:
+                self._truncated = {"type": "truncated", "bytes_dropped": 0}
+                self.add_block(self._truncated)
+            self._truncated["bytes_dropped"] += size
+            return
+
+        super().add(json_msg)
+
+    @property
+    def exhausted(self) -> bool:
+        """Whether the turn has exceeded ACCUMULATOR_HARD_LIMIT."""
+        return self.total_size > ACCUMULATOR_HARD_LIMIT
+
+
+def _record_result(message: ResultMessage, accumulator: _Accumulator):
+    """
+    Record cost and token usage from the terminal ResultMessage.
+
+    Args:
+        message: The SDK result message
+        accumulator: Accumulator for the current turn
+    """
+    if message.total_cost_usd is not None:
+        accumulator.cost_usd = message.total_cost_usd
+    if message.usage is not None:
+        accumulator.input_tokens = message.usage["input_tokens"]
+        accumulator.output_tokens = message.usage["output_tokens"]
+
+
+# SDK message type -> recorder for data carried outside the content blocks
+_MESSAGE_RECORDERS: dict[type, Callable[[Any, _Accumulator], None]] = {
+    ResultMessage: _record_result,
+}
+
 
 class AgentManager:
     """
@@ -34,12 +155,139 @@ class AgentManager:
             options: ClaudeAgentOptions for creating SDK clients
             jsonl_handler: JSONLHandler instance for managing JSONL files
         """
-        self.clients: Dict[str, ClaudeSDKClient] = {}  # claude_session_id -> client
+        # claude_session_id -> client, least recently used first
+        self.clients: OrderedDict[str, ClaudeSDKClient] = OrderedDict()
+        self.max_active_clients = MAX_ACTIVE_CLIENTS
         self.session_store = session_store
         self.options = options
         self.jsonl_handler = jsonl_handler
-        # Accumulator for streaming chunks (session_id -> content_blocks)
-        self.streaming_buffers: Dict[str, list[dict]] = {}
+        # Shared across turns and sessions: process_message output depends only
+        # on its input (last_message_type is bookkeeping that is never read)
+        self._handler = WebSocketStreamHandler()
+        # Per-session locks guarding client creation and cleanup
+        # (lock, number of holders and waiters), dropped when unused
+        self._session_locks: Dict[str, list] = {}
+        # claude_session_id -> number of turns currently streaming
+        self._active_turns: Dict[str, int] = {}
+        # claude_session_id -> turns still being written to MongoDB
+        self._pending_saves: Dict[str, set[asyncio.Task]] = {}
+        # claude_session_id -> error from a turn that failed to save, reported
+        # to the client at the start of the next turn
+        self._failed_saves: Dict[str, str] = {}
+        # Client started ahead of time for the next new session
+        self._spare_client: Optional[asyncio.Task[ClaudeSDKClient]] = None
+
+    @asynccontextmanager
+    async def _session_lock(self, claude_session_id: str):
+        """
+        Hold the session's lock, creating it on first use.
+
+        The lock is counted by its holders and waiters, and dropped once the
+        last of them leaves, so a second lock is never created for a session
+        while anyone is still queued on the first.
+
+        Args:
+            claude_session_id: The Claude session ID
+        """
+        entry = self._session_locks.get(claude_session_id)
+        if entry is None:
+            entry = self._session_locks[claude_session_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._session_locks[claude_session_id]
+
+    def _save_turn_in_background(
+        self, claude_session_id: str, save: Coroutine[Any, Any, None]
+    ) -> None:
+        """
+        Persist a finished turn without holding back the ``complete`` message.
+
+        The write overlaps with the user's next prompt. It is tracked per
+        session so that resuming or cleaning up the session waits for it. A
+        failed write is reported at the start of the session's next turn.
+
+        Args:
+            claude_session_id: The Claude session ID
+            save: Coroutine writing the turn
+        """
+
+        async def persist() -> None:
+            try:
+                await save
+            except Exception as e:
+                print(f"Error saving turn for session {claude_session_id}: {e}")
+                self._failed_saves[claude_session_id] = str(e)
+
+        task = asyncio.create_task(persist())
+        self._pending_saves.setdefault(claude_session_id, set()).add(task)
+
+        def forget(done: asyncio.Task) -> None:
+            tasks = self._pending_saves.get(claude_session_id)
+            if tasks is not None:
+                tasks.discard(done)
+                if not tasks:
+                    del self._pending_saves[claude_session_id]
+
+        task.add_done_callback(forget)
+
+    async def _wait_for_pending_save(self, claude_session_id: str):
+        """
+        Wait until every turn of the session has been written, if still pending.
+
+        Args:
+            claude_session_id: The Claude session ID
+        """
+        pending_saves = self._pending_saves.get(claude_session_id)
+        if pending_saves:
+            await asyncio.shield(asyncio.gather(*pending_saves))
+
+    async def _connect_client(self) -> ClaudeSDKClient:
+        """
+        Start a new SDK client with the default options.
+
+        Returns:
+            Connected Claude SDK client
+        """
+        client = ClaudeSDKClient(options=self.options)
+        await client.__aenter__()
+        return client
+
+    def prewarm_client(self):
+        """
+        Start a spare SDK client in the background for the next new session.
+
+        Launching the CLI process and opening its API connection is the
+        slowest part of a first query; doing it ahead of time keeps it off the
+        user's path.
+        """
+        if self._spare_client is None:
+            self._spare_client = asyncio.create_task(self._connect_client())
+
+    async def _take_new_client(self) -> ClaudeSDKClient:
+        """
+        Get a client for a new session, preferring the pre-warmed spare.
+
+        Returns:
+            Connected Claude SDK client
+        """
+        spare, self._spare_client = self._spare_client, None
+        client = None
+        if spare is not None:
+            try:
+                client = await spare
+            except Exception as e:
+                print(f"Spare SDK client failed to start: {e}")
+        if client is None:
+            client = await self._connect_client()
+
+        # Start the replacement spare for the next new session
+        self.prewarm_client()
+        return client
 
     def extract_session_id_from_message(self, message) -> Optional[str]:
         """
@@ -54,8 +302,9 @@ class AgentManager:
             Session ID if found, None otherwise
         """
         # Check if message has sessionId attribute directly
-        if hasattr(message, "session_id"):
-            return message.session_id
+        session_id = getattr(message, "session_id", None)
+        if session_id is not None:
+            return session_id
 
         # Check for sessionId in message dict representation
         if isinstance(message, dict) and "sessionId" in message:
@@ -63,6 +312,241 @@ class AgentManager:
 
         return None
 
+    async def _drain_response(
+        self,
+        client: ClaudeSDKClient,
+        queue: asyncio.Queue[Optional[dict]],
+        accumulator: _Accumulator,
+    ):
+        """
+        Producer: read the SDK response into a bounded queue.
+
+        Accumulation happens here so it stays in message order and keeps
+        running while the consumer is blocked on a slow socket. A ``None``
+        sentinel is queued when the response ends (or fails).
+
+        Args:
+            client: SDK client with a query in flight
+            queue: Bounded queue of processed JSON messages
+            accumulator: Accumulator for content blocks and usage
+        """
+        interrupted = False
+        try:
+            async for message in client.receive_response():
+                # Try to extract session ID from message
+                if accumulator.session_id is None:
+                    accumulator.session_id = getattr(message, "session_id", None)
+
+                # Extract usage information (type-dispatched, no probing)
+                record = _MESSAGE_RECORDERS.get(type(message))
+                if record is not None:
+                    record(message, accumulator)
+
+                # After an interrupt, read on to the ResultMessage but discard
+                # the rest so it cannot leak into the next turn
+                if interrupted:
+                    continue
+
+                # Process chunks and accumulate (same logic as frontend)
+                for json_msg in self._handler.process_message(message):
+                    accumulator.add(json_msg)
+                    await queue.put(json_msg)
+
+                # End a runaway turn before it outgrows a Mongo document
+                if accumulator.exhausted:
+                    print("Response exceeded size limit, interrupting turn")
+                    await client.interrupt()
+                    interrupted = True
+        finally:
+            # Wake the consumer unless it is the one that cancelled us; a
+            # cancelled producer may be stuck on a full queue
+            if not asyncio.current_task().cancelling():
+                await queue.put(None)
+
+    async def _stream_response(
+        self, client: ClaudeSDKClient, accumulator: _Accumulator
+    ) -> AsyncGenerator[dict, None]:
+        """
+        Consumer: yield processed messages as the producer queues them.
+
+        The queue bound applies back-pressure to the SDK reader when the
+        socket falls behind, without coupling every chunk to a send. While
+        the socket is behind, consecutive text or thinking chunks that have
+        piled up in the queue are sent as one message (up to
+        STREAM_COALESCE_MAX_CHARS).
+
+        Args:
+            client: SDK client with a query in flight
+            accumulator: Accumulator filled in by the producer
+
+        Yields:
+            JSON messages for streaming to frontend
+        """
+        queue: asyncio.Queue[Optional[dict]] = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        producer = asyncio.create_task(self._drain_response(client, queue, accumulator))
+        try:
+            json_msg = await queue.get()
+            while json_msg is not None:
+                # Merge text/thinking chunks already waiting behind this one
+                # into a single message, so a burst costs one socket send
+                following = _NOTHING_QUEUED
+                msg_type = json_msg["type"]
+                if msg_type in DELTA_MESSAGE_TYPES:
+                    parts = [json_msg["content"]]
+                    size = len(parts[0])
+                    while size < STREAM_COALESCE_MAX_CHARS and not queue.empty():
+                        following = queue.get_nowait()
+                        if following is None or following["type"] != msg_type:
+                            break
+                        parts.append(following["content"])
+                        size += len(following["content"])
+                        following = _NOTHING_QUEUED
+                    if len(parts) > 1:
+                        json_msg = {"type": msg_type, "content": "".join(parts)}
+
+                yield json_msg
+                if following is _NOTHING_QUEUED:
+                    following = await queue.get()
+                json_msg = following
+            # Surface any SDK error raised in the producer
+            await producer
+        finally:
+            if not producer.done():
+                # Consumer went away mid-response: stop reading and make sure
+                # the rest of this response cannot leak into the next turn
+                producer.cancel()
+                await asyncio.shield(self._abandon_response(client))
+
+    async def _abandon_response(self, client: ClaudeSDKClient):
+        """
+        Interrupt an in-flight response and discard what is left of it.
+
+        Args:
+            client: SDK client whose response is no longer being consumed
+        """
+        try:
+            await client.interrupt()
+            async for _ in client.receive_response():
+                pass
+        except Exception as e:
+            print(f"Error abandoning SDK response: {e}")
+
+    async def _save_turn(
+        self,
+        claude_session_id: str,
+        prompt: str,
+        user_seq: int,
+        accumulator: _Accumulator,
+        start_ns: int,
+    ):
+        """
+        Build the user and assistant messages for a turn and persist them.
+
+        Args:
+            claude_session_id: The Claude session ID
+            prompt: User's prompt text
+            user_seq: Sequence number of the user message
+            accumulator: Accumulated assistant content and usage
+            start_ns: time.monotonic_ns() when the response started streaming
+        """
+        user_msg = ClaudeAgentMessage.model_construct(
+            session_id=claude_session_id,
+            sequence=user_seq,
+            role=MessageRole.USER,
+            content_blocks=[{"type": "text", "content": prompt}],
+        )
+
+        duration_ms = (time.monotonic_ns() - start_ns) // 1_000_000
+        assistant_msg = ClaudeAgentMessage.model_construct(
+            session_id=claude_session_id,
+            sequence=user_seq + 1,
+            role=MessageRole.ASSISTANT,
+            content_blocks=accumulator.finalize(),
+            duration_ms=duration_ms,
+            cost_usd=accumulator.cost_usd,
+            input_tokens=accumulator.input_tokens,
+            output_tokens=accumulator.output_tokens,
+        )
+
+        # Save both messages and session cumulative usage together
+        await self.session_store.persist_turn(
+            claude_session_id,
+            user_msg,
+            assistant_msg,
+            cost_usd=accumulator.cost_usd,
+            input_tokens=accumulator.input_tokens,
+            output_tokens=accumulator.output_tokens,
+        )
+
+    async def _finish_first_turn(
+        self,
+        client: ClaudeSDKClient,
+        prompt: str,
+        accumulator: _Accumulator,
+        start_ns: int,
+        watcher_task: asyncio.Task,
+    ) -> str:
+        """
+        Resolve the new session's ID, store the session and its first turn.
+
+        Args:
+            client: SDK client that handled the first query
+            prompt: User's first message
+            accumulator: Accumulated assistant content and usage
+            start_ns: time.monotonic_ns() when the response started streaming
+            watcher_task: Task waiting for the session JSONL file
+
+        Returns:
+            The captured session ID
+
+        Raises:
+            Exception: If session ID cannot be captured
+        """
+        session_id_captured = accumulator.session_id
+
+        # After streaming completes, fall back to the JSONL file the SDK
+        # created for this session
+        if session_id_captured is None:
+            try:
+                session_id_captured = await asyncio.wait_for(
+                    watcher_task, timeout=JSONL_WATCH_TIMEOUT_SECONDS
+                )
+            except TimeoutError:
+                pass
+        else:
+            watcher_task.cancel()
+
+        if not session_id_captured:
+            await self._discard_new_client(client, watcher_task)
+            raise Exception("Could not capture session ID from Claude SDK")
+
+        # Store session in MongoDB; the first turn takes sequences 0 and 1
+        session = ClaudeAgentSession(claude_session_id=session_id_captured, next_seq=2)
+        await self.session_store.create_session(session)
+
+        await self._save_turn(session_id_captured, prompt, 0, accumulator, start_ns)
+
+        # Cache client
+        await self._cache_client(session_id_captured, client)
+
+        return session_id_captured
+
+    async def _discard_new_client(
+        self, client: ClaudeSDKClient, watcher_task: asyncio.Task
+    ):
+        """
+        Close a first-turn client that will not be cached and stop its watcher.
+
+        Args:
+            client: SDK client created for the new session
+            watcher_task: Task waiting for the session JSONL file
+        """
+        watcher_task.cancel()
+        try:
+            await client.__aexit__(None, None, None)
+        except Exception as e:
+            print(f"Error closing SDK client: {e}")
+
     async def create_session_with_first_query(
         self, prompt: str
     ) -> tuple[str, AsyncGenerator[dict, None]]:
@@ -82,125 +566,58 @@ class AgentManager:
         Raises:
             Exception: If session ID cannot be captured
         """
-        # Create new client
-        client = ClaudeSDKClient(options=self.options)
-        await client.__aenter__()
+        # Take the pre-warmed client (or start one)
+        client = await self._take_new_client()
+
+        # Watch for the session JSONL before querying so its creation is not missed
+        project_path = self.jsonl_handler.get_project_path()
+        project_path.mkdir(parents=True, exist_ok=True)
+        watcher_task = asyncio.create_task(_await_new_jsonl(project_path))
 
         # Send the first query
-        await client.query(prompt)
+        try:
+            await client.query(prompt)
+        except BaseException:
+            await self._discard_new_client(client, watcher_task)
+            raise
 
         # We need to peek at the response to get the session ID
         # The SDK writes session info to the JSONL file
         # We'll need to read the JSONL file after the first message
         async def response_generator():
-            handler = WebSocketStreamHandler()
-            content_blocks = []
-            start_time = datetime.now(UTC)
-            cost_usd: Optional[float] = None
-            input_tokens: Optional[int] = None
-            output_tokens: Optional[int] = None
-            session_id_captured: Optional[str] = None
-
-            async for message in client.receive_response():
-                # Try to extract session ID from message
-                if session_id_captured is None:
-                    session_id_captured = self.extract_session_id_from_message(message)
-
-                # Extract usage information
-                if isinstance(message, ResultMessage):
-                    if hasattr(message, "total_cost_usd"):
-                        cost_usd = message.total_cost_usd  # type: ignore
-                    if hasattr(message, "usage"):
-                        input_tokens = message.usage["input_tokens"]  # type: ignore
-                        output_tokens = message.usage["output_tokens"]  # type: ignore
-
-                # Process and yield chunks
-                json_messages = handler.process_message(message)
-                for json_msg in json_messages:
-                    yield json_msg
-
-                    # Accumulate chunks
-                    if json_msg["type"] in ["text", "thinking"]:
-                        if (
-                            content_blocks
-                            and content_blocks[-1]["type"] == json_msg["type"]
-                        ):
-                            content_blocks[-1]["content"] += json_msg["content"]
-                        else:
-                            content_blocks.append(
-                                {
-                                    "type": json_msg["type"],
-                                    "content": json_msg["content"],
-                                }
-                            )
-                    elif json_msg["type"] in ["tool_use", "tool_result"]:
-                        content_blocks.append(json_msg)
-
-            # After streaming completes, read JSONL file to get session ID
-            # The SDK writes session info to the JSONL file
-            if session_id_captured is None:
-                # Read the JSONL files in the project directory
-                # to find the newest session
-                import os
-
-                project_path = self.jsonl_handler.get_project_path()
-                if project_path.exists():
-                    jsonl_files = list(project_path.glob("*.jsonl"))
-                    if jsonl_files:
-                        # Get the most recently modified file
-                        newest_file = max(jsonl_files, key=os.path.getmtime)
-                        session_id_captured = newest_file.stem
-
-            if not session_id_captured:
-                raise Exception("Could not capture session ID from Claude SDK")
-
-            # Store session in MongoDB
-            session = ClaudeAgentSession(claude_session_id=session_id_captured)
-            await self.session_store.create_session(session)
-
-            # Save user message
-            user_seq = 0
-            user_msg = ClaudeAgentMessage(
-                session_id=session_id_captured,
-                sequence=user_seq,
-                role=MessageRole.USER,
-                content_blocks=[{"type": "text", "content": prompt}],
-            )
-            await self.session_store.save_message(user_msg)
-            await self.session_store.increment_message_count(session_id_captured)
-
-            # Save assistant message
-            duration_ms = int((datetime.now(UTC) - start_time).total_seconds() * 1000)
-            assistant_seq = 1
-            assistant_msg = ClaudeAgentMessage(
-                session_id=session_id_captured,
-                sequence=assistant_seq,
-                role=MessageRole.ASSISTANT,
-                content_blocks=content_blocks,
-                duration_ms=duration_ms,
-                cost_usd=cost_usd,
-                input_tokens=input_tokens,
-                output_tokens=output_tokens,
-            )
-            await self.session_store.save_message(assistant_msg)
-            await self.session_store.increment_message_count(session_id_captured)
-
-            # Update session usage
-            if (
-                cost_usd is not None
-                or input_tokens is not None
-                or output_tokens is not None
-            ):
-                await self.session_store.update_session_usage(
-                    session_id_captured,
-                    cost_usd=cost_usd or 0.0,
-                    input_tokens=input_tokens or 0,
-                    output_tokens=output_tokens or 0,
+            accumulator = _Accumulator()
+            start_ns = time.monotonic_ns()
+
+            def finish_first_turn() -> asyncio.Future[str]:
+                # Shielded so the turn is still saved if the consumer
+                # disconnects mid-stream and the generator is closed
+                return asyncio.shield(
+                    self._finish_first_turn(
+                        client, prompt, accumulator, start_ns, watcher_task
+                    )
                 )
 
-            # Cache client
-            self.clients[session_id_captured] = client
-            self.streaming_buffers[session_id_captured] = []
+            try:
+                # Closed with this generator, so the producer is stopped before
+                # the turn is saved
+                async with aclosing(
+                    self._stream_response(client, accumulator)
+                ) as stream:
+                    async for json_msg in stream:
+                        yield json_msg
+            except (GeneratorExit, asyncio.CancelledError):
+                # Consumer went away: save what was streamed so far, without
+                # replacing the exit with a save error
+                try:
+                    await finish_first_turn()
+                except Exception as e:
+                    print(f"Error saving first turn: {e}")
+                raise
+            except BaseException:
+                # SDK error: nothing to save; surface the original error
+                await self._discard_new_client(client, watcher_task)
+                raise
+            session_id_captured = await finish_first_turn()
 
             # Signal session created
             yield {"type": "session_id_captured", "session_id": session_id_captured}
@@ -225,27 +642,34 @@ class AgentManager:
         Returns:
             The Claude SDK client for this session
         """
-        # Check if already cached
+        # Callers read the session history next; make sure it is complete
+        await self._wait_for_pending_save(claude_session_id)
+
+        # Fast path: already cached
         if claude_session_id in self.clients:
+            self.clients.move_to_end(claude_session_id)
             return self.clients[claude_session_id]
 
-        # Restore JSONL file from MongoDB (overwrites local file)
-        await self.jsonl_handler.restore_from_mongodb(
-            claude_session_id, self.session_store
-        )
+        # Serialize per session so concurrent resumes share one client
+        async with self._session_lock(claude_session_id):
+            # Re-check now that we hold the lock
+            if claude_session_id in self.clients:
+                return self.clients[claude_session_id]
 
-        # Create new client with resume option
-        resume_options = ClaudeAgentOptions(
-            **{**self.options.__dict__, "resume": claude_session_id}
-        )
-        client = ClaudeSDKClient(options=resume_options)
-        await client.__aenter__()
+            # Restore JSONL file from MongoDB (overwrites local file)
+            await self.jsonl_handler.restore_from_mongodb(
+                claude_session_id, self.session_store
+            )
 
-        # Cache it
-        self.clients[claude_session_id] = client
-        self.streaming_buffers[claude_session_id] = []
+            # Create new client with resume option
+            resume_options = dataclasses.replace(self.options, resume=claude_session_id)
+            client = ClaudeSDKClient(options=resume_options)
+            await client.__aenter__()
 
-        return client
+            # Cache it
+            await self._cache_client(claude_session_id, client)
+
+            return client
 
     async def send_query_with_persistence(
         self, claude_session_id: str, prompt: str, websocket: WebSocket
@@ -263,102 +687,95 @@ class AgentManager:
         Yields:
             JSON messages to send via WebSocket
         """
-        client = self.clients.get(claude_session_id)
-        if not client:
-            raise Exception(f"No client found for session {claude_session_id}")
-
-        # Save user message
-        user_seq = await self.session_store.get_next_sequence(claude_session_id)
-        user_msg = ClaudeAgentMessage(
-            session_id=claude_session_id,
-            sequence=user_seq,
-            role=MessageRole.USER,
-            content_blocks=[{"type": "text", "content": prompt}],
-        )
-        await self.session_store.save_message(user_msg)
-        await self.session_store.increment_message_count(claude_session_id)
-
-        # Send query (client maintains context internally)
-        await client.query(prompt)
-
-        # Stream response and accumulate chunks
-        handler = WebSocketStreamHandler()
-        content_blocks = []
-        start_time = datetime.now(UTC)
-
-        # Usage tracking
-        cost_usd: Optional[float] = None
-        input_tokens: Optional[int] = None
-        output_tokens: Optional[int] = None
-
-        async for message in client.receive_response():
-            # Check if this is a ResultMessage with usage stats
-            if isinstance(message, ResultMessage):
-                # Extract usage information
-                if hasattr(message, "total_cost_usd"):
-                    cost_usd = message.total_cost_usd  # type: ignore
-                if hasattr(message, "usage"):
-                    input_tokens = message.usage["input_tokens"]  # type: ignore
-                if hasattr(message, "usage"):
-                    output_tokens = message.usage["output_tokens"]  # type: ignore
-
-                # print(
-                #     f"Usage: cost=${cost_usd}, "
-                #     f"input={input_tokens}, output={output_tokens}"
-                # )
-
-            # Process and yield chunks to frontend
-            json_messages = handler.process_message(message)
-            for json_msg in json_messages:
-                yield json_msg
-
-                # Accumulate chunks (same logic as frontend)
-                if json_msg["type"] in ["text", "thinking"]:
-                    # Append to last block of same type, or create new
-                    if (
-                        content_blocks
-                        and content_blocks[-1]["type"] == json_msg["type"]
-                    ):
-                        content_blocks[-1]["content"] += json_msg["content"]
-                    else:
-                        content_blocks.append(
-                            {"type": json_msg["type"], "content": json_msg["content"]}
-                        )
-                elif json_msg["type"] in ["tool_use", "tool_result"]:
-                    # Add as new block
-                    content_blocks.append(json_msg)
-
-        # Save complete assistant message with usage stats
-        duration_ms = int((datetime.now(UTC) - start_time).total_seconds() * 1000)
-        assistant_seq = await self.session_store.get_next_sequence(claude_session_id)
-        assistant_msg = ClaudeAgentMessage(
-            session_id=claude_session_id,
-            sequence=assistant_seq,
-            role=MessageRole.ASSISTANT,
-            content_blocks=content_blocks,
-            duration_ms=duration_ms,
-            cost_usd=cost_usd,
-            input_tokens=input_tokens,
-            output_tokens=output_tokens,
+        # Counted as active for the whole turn so LRU eviction skips it
+        self._active_turns[claude_session_id] = (
+            self._active_turns.get(claude_session_id, 0) + 1
         )
-        await self.session_store.save_message(assistant_msg)
-        await self.session_store.increment_message_count(claude_session_id)
-
-        # Update session cumulative usage
-        if (
-            cost_usd is not None
-            or input_tokens is not None
-            or output_tokens is not None
-        ):
-            await self.session_store.update_session_usage(
-                claude_session_id,
-                cost_usd=cost_usd or 0.0,
-                input_tokens=input_tokens or 0,
-                output_tokens=output_tokens or 0,
+        try:
+            client = self.clients.get(claude_session_id)
+            if client is None:
+                # Evicted (or never resumed on this pod): resume it again
+                client = await self.resume_session(claude_session_id)
+            else:
+                self.clients.move_to_end(claude_session_id)
+
+            # The previous turn was streamed but could not be stored
+            save_error = self._failed_saves.pop(claude_session_id, None)
+            if save_error is not None:
+                yield {
+                    "type": "error",
+                    "message": f"Previous turn was not saved: {save_error}",
+                }
+
+            # Reserve the turn's sequence numbers (user message, then assistant)
+            # while the query goes out; they are only needed when the turn is saved
+            user_seq_task = asyncio.create_task(
+                self.session_store.get_next_sequence(claude_session_id, count=2)
             )
 
-        # Send complete signal
-        yield {"type": "complete"}
+            # Send query (client maintains context internally)
+            try:
+                await client.query(prompt)
+            except BaseException:
+                user_seq_task.cancel()
+                raise
+
+            # Stream response and accumulate chunks
+            accumulator = _Accumulator()
+            start_ns = time.monotonic_ns()
+
+            async def save_turn():
+                user_seq = await user_seq_task
+                await self._save_turn(
+                    claude_session_id, prompt, user_seq, accumulator, start_ns
+                )
+
+            try:
+                # Closed with this generator, so the producer is stopped before
+                # the turn is saved
+                async with aclosing(
+                    self._stream_response(client, accumulator)
+                ) as stream:
+                    async for json_msg in stream:
+                        yield json_msg
+            finally:
+                # Saved by a background task, so the turn is still written if the
+                # consumer disconnects mid-stream, and ``complete`` is not held
+                # back by the database
+                self._save_turn_in_background(claude_session_id, save_turn())
+
+            # Send complete signal
+            yield {"type": "complete"}
+        finally:
+            remaining = self._active_turns.pop(claude_session_id) - 1
+            if remaining:
+                self._active_turns[claude_session_id] = remaining
+
+    async def _cache_client(self, claude_session_id: str, client: ClaudeSDKClient):
+        """
+        Cache a client, closing the least recently used idle ones over the limit.
+
+        Args:
+            claude_session_id: The Claude session ID
+            client: The SDK client for this session
+        """
+        self.clients[claude_session_id] = client
+        self.clients.move_to_end(claude_session_id)
+        while len(self.clients) > self.max_active_clients:
+            # Oldest idle client; one with a turn in flight is kept, and the
+            # cache is trimmed again the next time a client is added
+            evicted_session_id = next(
+                (
+                    session_id
+                    for session_id in self.clients
+                    if session_id != claude_session_id
+                    and session_id not in self._active_turns
+                ),
+                None,
+            )
+            if evicted_session_id is None:
+                break
+            await self.cleanup_client(evicted_session_id)
 
     async def cleanup_client(self, claude_session_id: str):
         """
@@ -367,17 +784,34 @@ class AgentManager:
         Args:
             claude_session_id: The Claude session ID
         """
-        if claude_session_id in self.clients:
-            client = self.clients.pop(claude_session_id)
-            await client.__aexit__(None, None, None)
-        if claude_session_id in self.streaming_buffers:
-            del self.streaming_buffers[claude_session_id]
+        await self._wait_for_pending_save(claude_session_id)
+
+        async with self._session_lock(claude_session_id):
+            if claude_session_id in self.clients:
+                client = self.clients.pop(claude_session_id)
+                await client.__aexit__(None, None, None)
 
     async def cleanup_all(self):
-        """Clean up all active clients."""
+        """Clean up all active clients, including the spare."""
+        # Finish every background turn save, including those of sessions
+        # whose client was already evicted
+        pending_saves = [
+            task for tasks in self._pending_saves.values() for task in tasks
+        ]
+        if pending_saves:
+            await asyncio.gather(*pending_saves)
+
         for claude_session_id in list(self.clients.keys()):
             await self.cleanup_client(claude_session_id)
 
+        spare, self._spare_client = self._spare_client, None
+        if spare is not None:
+            try:
+                client = await spare
+            except Exception:
+                return
+            await client.__aexit__(None, None, None)
+
 
 # Global instance
 _agent_manager: Optional[AgentManager] = None
@@ -397,7 +831,7 @@ def init_agent_manager(
     session_store: SessionStore,
     options: ClaudeAgentOptions,
     jsonl_handler: JSONLHandler,
-):
+) -> AgentManager:
     """
     Initialize the global agent manager.
 
@@ -405,6 +839,10 @@ def init_agent_manager(
         session_store: SessionStore instance
         options: ClaudeAgentOptions for SDK clients
         jsonl_handler: JSONLHandler instance for managing JSONL files
+
+    Returns:
+        The initialized agent manager
     """
     global _agent_manager
     _agent_manager = AgentManager(session_store, options, jsonl_handler)
+    return _agent_manager
@@ -1,5 +1,8 @@
 """Service for file upload/download in workspace threads."""
 
+import asyncio
+import os
+import stat
 from pathlib import Path
 from typing import Any
 
@@ -9,13 +12,24 @@ from metropolis.db.models import FileMetadata, WorkspaceThread
 from metropolis.db.workspace_thread_store import WorkspaceThreadStore
 from metropolis.dependencies.workspace_folder import get_execution_environment_folder
 from metropolis.utils.file_utils import (
+    MAX_FILE_SIZE,
     get_file_extension,
     get_mime_type,
+    get_mime_type_by_ext,
     sanitize_filename,
     validate_file_size,
     validate_file_type,
 )
 
+# Read size when streaming uploads to disk
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+# Folder, next to the execution environments, that holds in-progress uploads.
+# Keeping it outside every env folder hides partial files from the agent and
+# from list_files, while staying on the same filesystem so the final
+# os.replace is atomic.
+UPLOAD_STAGING_DIR_NAME = ".uploads"
+
 
 class FileService:
     """Service for managing file uploads/downloads in workspace threads."""
@@ -50,6 +64,11 @@ class FileService:
         if not file.filename:
             raise ValueError("File must have a filename")
 
+        # Reject oversize uploads before touching the thread or the disk;
+        # Starlette records the size while spooling the multipart body
+        if file.size is not None and not validate_file_size(file.size):
+            raise ValueError("File too large (max 16 MB)")
+
         file_ext = get_file_extension(file.filename)
         if not validate_file_type(file_ext):
             raise ValueError(
@@ -57,13 +76,6 @@ class FileService:
                 f"Allowed types: pptx, csv, pdf, txt, md, xlsx, html"
             )
 
-        # Read file contents
-        contents = await file.read()
-
-        # Validate file size
-        if not validate_file_size(len(contents)):
-            raise ValueError("File too large (max 16 MB)")
-
         # Get thread and verify ownership
         thread: WorkspaceThread | None = await self.workspace_thread_store.get_thread(
             thread_id
@@ -77,15 +89,36 @@ class FileService:
         # Get execution environment folder
         env_folder = get_execution_environment_folder(thread.execution_environment)
 
-        # Save file
+        # Stream the upload to a temporary file in chunks, then move it into
+        # place so an aborted upload never clobbers an existing file
         file_path = env_folder / safe_filename
-        with open(file_path, "wb") as f:
-            f.write(contents)
+        staging_dir = env_folder.parent / UPLOAD_STAGING_DIR_NAME
+        await asyncio.to_thread(staging_dir.mkdir, exist_ok=True)
+        part_path = staging_dir / f"{thread.execution_environment}.{safe_filename}.part"
+        file_size = 0
+        f = await asyncio.to_thread(open, part_path, "wb")
+        try:
+            # Never read more than one byte past the limit, in case the size
+            # was not recorded up front
+            while chunk := await file.read(
+                min(UPLOAD_CHUNK_SIZE, MAX_FILE_SIZE + 1 - file_size)
+            ):
+                file_size += len(chunk)
+                # Validate file size
+                if not validate_file_size(file_size):
+                    raise ValueError("File too large (max 16 MB)")
+                await asyncio.to_thread(f.write, chunk)
+            await asyncio.to_thread(f.close)
+            await asyncio.to_thread(os.replace, part_path, file_path)
+        except BaseException:
+            await asyncio.to_thread(f.close)
+            await asyncio.to_thread(part_path.unlink, missing_ok=True)
+            raise
 
         # Create metadata
         file_meta = FileMetadata(
             filename=safe_filename,
-            file_size=len(contents),
+            file_size=file_size,
             file_type=file_ext,
             mime_type=get_mime_type(safe_filename),
         )
@@ -121,40 +154,43 @@ class FileService:
         # Get execution environment folder
         env_folder = get_execution_environment_folder(thread.execution_environment)
 
-        # Scan folder for all files
+        # Index tracked metadata by filename for constant-time lookups
+        meta_by_name: dict[str, FileMetadata] = {m.filename: m for m in thread.files}
+
+        # Scan folder for all files; DirEntry caches the type and stat
+        # information from the directory read, saving a syscall per entry
         all_files: list[dict[str, Any]] = []
         if env_folder.exists():
-            for file_path in env_folder.iterdir():
-                if file_path.is_file():
-                    # Check if we have metadata
-                    file_meta = None
-                    for meta in thread.files:
-                        if meta.filename == file_path.name:
-                            file_meta = meta
-                            break
+            with os.scandir(env_folder) as entries:
+                for entry in entries:
+                    if not entry.is_file():
+                        continue
 
+                    # Check if we have metadata
+                    file_meta = meta_by_name.get(entry.name)
+                    if file_meta:
+                        all_files.append(
+                            {
+                                "filename": entry.name,
+                                "file_size": file_meta.file_size,
+                                "uploaded_at": file_meta.uploaded_at,
+                                "file_type": file_meta.file_type,
+                                "mime_type": file_meta.mime_type,
+                                "is_tracked": True,
+                            }
+                        )
+                        continue
+
+                    # Untracked file: parse the extension once
+                    file_ext = get_file_extension(entry.name)
                     all_files.append(
                         {
-                            "filename": file_path.name,
-                            "file_size": (
-                                file_path.stat().st_size
-                                if not file_meta
-                                else file_meta.file_size
-                            ),
-                            "uploaded_at": (
-                                file_meta.uploaded_at if file_meta else None
-                            ),
-                            "file_type": (
-                                file_meta.file_type
-                                if file_meta
-                                else get_file_extension(file_path.name)
-                            ),
-                            "mime_type": (
-                                file_meta.mime_type
-                                if file_meta
-                                else get_mime_type(file_path.name)
-                            ),
-                            "is_tracked": file_meta is not None,
+                            "filename": entry.name,
+                            "file_size": entry.stat().st_size,
+                            "uploaded_at": None,
+                            "file_type": file_ext,
+                            "mime_type": get_mime_type_by_ext(file_ext),
+                            "is_tracked": False,
                         }
                     )
 
@@ -162,7 +198,7 @@ class FileService:
 
     async def download_file(
         self, workspace_id: str, thread_id: str, filename: str
-    ) -> tuple[Path, str]:
+    ) -> tuple[Path, str, os.stat_result]:
         """
         Get file path for download.
 
@@ -172,7 +208,8 @@ class FileService:
             filename: Filename to download
 
         Returns:
-            Tuple of (file_path, mime_type)
+            Tuple of (file_path, mime_type, stat_result). The stat result is
+            reused by the response so the file is only stat'ed once.
 
         Raises:
             ValueError: If thread not found
@@ -192,13 +229,18 @@ class FileService:
         env_folder = get_execution_environment_folder(thread.execution_environment)
         file_path = env_folder / safe_filename
 
-        if not file_path.exists() or not file_path.is_file():
+        # Single stat call covers both the existence and regular-file checks
+        try:
+            stat_result = file_path.stat()
+        except FileNotFoundError:
+            stat_result = None
+        if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
             raise FileNotFoundError(f"File {filename} not found")
 
         # Get MIME type
         mime_type = get_mime_type(safe_filename)
 
-        return file_path, mime_type
+        return file_path, mime_type, stat_result
 
     async def delete_file(
         self, workspace_id: str, thread_id: str, filename: str
@@ -231,8 +273,7 @@ class FileService:
         env_folder = get_execution_environment_folder(thread.execution_environment)
         file_path = env_folder / safe_filename
 
-        if file_path.exists():
-            file_path.unlink()
+        await asyncio.to_thread(file_path.unlink, missing_ok=True)
 
         # Remove metadata
         await self.workspace_thread_store.remove_file_metadata(thread_id, safe_filename)
@@ -1,5 +1,6 @@
 """Handler for Claude Agent SDK JSONL session files."""
 
+import asyncio
 import os
 from pathlib import Path
 from typing import Optional, Union
@@ -7,6 +8,15 @@ from typing import Optional, Union
 from metropolis.db.session_store import SessionStore
 from metropolis.db.workspace_thread_store import WorkspaceThreadStore
 
+# Lines written per writelines() call when restoring from MongoDB
+JSONL_WRITE_BATCH_SIZE = 256
+
+# Buffer size for binary JSONL writes
+JSONL_WRITE_BUFFER_SIZE = 4 * 1024 * 1024  # 4 MB
+
+# Suffix of the temp file a restore writes before replacing the session file
+JSONL_RESTORE_SUFFIX = ".restoring"
+
 
 class JSONLHandler:
     """
@@ -25,6 +35,16 @@ class JSONLHandler:
         """
         self.workspace_root = workspace_root or os.getcwd()
 
+        # Encode the workspace path to create a valid directory name
+        # Replace path separators with hyphens
+        project_name = self.workspace_root.replace(os.sep, "-")
+        # Note: SDK keeps the leading dash, e.g., "-home-user-project"
+
+        # Construct the path following Claude SDK convention (computed once;
+        # Path.home() consults the password database on every call)
+        self._project_path = Path.home() / ".claude" / "projects" / project_name
+        self._project_path_exists = False
+
     def get_project_path(self) -> Path:
         """
         Get the project directory path for JSONL files.
@@ -35,16 +55,7 @@ class JSONLHandler:
         Returns:
             Path to the project directory
         """
-        # Encode the workspace path to create a valid directory name
-        # Replace path separators with hyphens
-        project_name = self.workspace_root.replace(os.sep, "-")
-        # Note: SDK keeps the leading dash, e.g., "-home-user-project"
-
-        # Construct the path following Claude SDK convention
-        home_dir = Path.home()
-        project_path = home_dir / ".claude" / "projects" / project_name
-
-        return project_path
+        return self._project_path
 
     def get_session_file_path(self, session_id: str) -> Path:
         """
@@ -61,8 +72,10 @@ class JSONLHandler:
 
     def ensure_directory_exists(self):
         """Create the project directory if it doesn't exist."""
-        project_path = self.get_project_path()
-        project_path.mkdir(parents=True, exist_ok=True)
+        if self._project_path_exists:
+            return
+        self._project_path.mkdir(parents=True, exist_ok=True)
+        self._project_path_exists = True
 
     def read_jsonl_file(self, session_id: str) -> list[str]:
         """
@@ -76,18 +89,20 @@ class JSONLHandler:
         """
         file_path = self.get_session_file_path(session_id)
 
-        if not file_path.exists():
+        # Read the whole file in one call and split at the C level, rather
+        # than iterating the text-mode line reader
+        try:
+            with open(file_path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
             return []
 
-        lines = []
-        with open(file_path, "r", encoding="utf-8") as f:
-            for line in f:
-                # Strip newline characters but keep the content
-                stripped = line.rstrip("\n\r")
-                if stripped:  # Skip empty lines
-                    lines.append(stripped)
-
-        return lines
+        # Strip carriage returns but keep the content; skip empty lines
+        return [
+            stripped.decode("utf-8")
+            for line in data.split(b"\n")
+            if (stripped := line.rstrip(b"\r"))
+        ]
 
     def write_jsonl_file(self, session_id: str, lines: list[str]):
         """
@@ -100,9 +115,11 @@ class JSONLHandler:
         self.ensure_directory_exists()
         file_path = self.get_session_file_path(session_id)
 
-        with open(file_path, "w", encoding="utf-8") as f:
-            for line in lines:
-                f.write(line + "\n")
+        # One pre-encoded payload through a large binary buffer instead of a
+        # text-mode write per line
+        payload = "".join(line + "\n" for line in lines).encode("utf-8")
+        with open(file_path, "wb", buffering=JSONL_WRITE_BUFFER_SIZE) as f:
+            f.write(payload)
 
     async def persist_to_mongodb(
         self, session_id: str, session_store: Union[SessionStore, WorkspaceThreadStore]
@@ -110,13 +127,14 @@ class JSONLHandler:
         """
         Read local JSONL file and save to MongoDB.
 
-        Called when WebSocket disconnects to backup session history.
+        Called when WebSocket disconnects to backup session history. The file
+        is read in a worker thread so other streams keep running meanwhile.
 
         Args:
             session_id: The Claude session ID
             session_store: SessionStore or WorkspaceThreadStore instance
         """
-        lines = self.read_jsonl_file(session_id)
+        lines = await asyncio.to_thread(self.read_jsonl_file, session_id)
         if lines:
             await session_store.save_jsonl_lines(session_id, lines)
 
@@ -127,12 +145,56 @@ class JSONLHandler:
         Read from MongoDB and write local JSONL file (overwrites existing).
 
         Called when resuming a session to restore conversation history.
-        MongoDB is treated as the source of truth.
+        MongoDB is treated as the source of truth. Lines are written to a
+        sibling temp file that replaces the session file only once every line
+        has arrived, so a failed or cancelled restore leaves the existing file
+        untouched. Each batch is written in a worker thread while the next
+        lines are fetched from MongoDB.
 
         Args:
             session_id: The Claude session ID
             session_store: SessionStore or WorkspaceThreadStore instance
         """
-        lines = await session_store.get_jsonl_lines(session_id)
-        if lines:
-            self.write_jsonl_file(session_id, lines)
+        # Stream the cursor rather than loading every line; the file is only
+        # (over)written once MongoDB actually has lines for the session
+        lines = session_store.stream_jsonl_lines(session_id)
+        try:
+            first_line = await anext(lines, None)
+            if first_line is None:
+                return
+
+            await asyncio.to_thread(self.ensure_directory_exists)
+            file_path = self.get_session_file_path(session_id)
+            tmp_path = file_path.with_name(file_path.name + JSONL_RESTORE_SUFFIX)
+            f = await asyncio.to_thread(
+                open, tmp_path, "wb", buffering=JSONL_WRITE_BUFFER_SIZE
+            )
+            writing: Optional[asyncio.Future] = None
+            restored = False
+            try:
+                batch = [(first_line + "\n").encode("utf-8")]
+                async for line in lines:
+                    batch.append((line + "\n").encode("utf-8"))
+                    if len(batch) >= JSONL_WRITE_BATCH_SIZE:
+                        # One write in flight at a time, overlapping the fetch
+                        if writing is not None:
+                            await writing
+                        writing = asyncio.ensure_future(
+                            asyncio.to_thread(f.writelines, batch)
+                        )
+                        batch = []
+                if writing is not None:
+                    await writing
+                await asyncio.to_thread(f.writelines, batch)
+                restored = True
+            finally:
+                # The file must not be closed under a write still running
+                if writing is not None and not writing.done():
+                    await asyncio.wait([writing])
+                await asyncio.to_thread(f.close)
+                if restored:
+                    await asyncio.to_thread(os.replace, tmp_path, file_path)
+                else:
+                    await asyncio.to_thread(tmp_path.unlink, missing_ok=True)
+        finally:
+            await lines.aclose()
@@ -1,6 +1,6 @@
 """Service for executing workflows using Claude Agent SDK."""
 
-import json
+import asyncio
 import uuid
 from datetime import UTC, datetime
 from pathlib import Path
@@ -8,11 +8,14 @@ from typing import AsyncGenerator
 
 from claude_agent_sdk import ClaudeSDKClient
 
+from metropolis.db.client import get_write_semaphore
 from metropolis.db.models import WorkflowRun
 from metropolis.db.skill_store import SkillStore
 from metropolis.db.workflow_store import WorkflowStore
 from metropolis.services.agent_service import get_workflow_agent_option
 from metropolis.utils.artifact_handler import copy_artifacts_from_temp_folder
+from metropolis.utils.content_blocks import ContentBlockBuffer
+from metropolis.utils.sse import sse_event
 from metropolis.utils.websocket_handler import StreamHandler
 
 
@@ -26,7 +29,7 @@ class WorkflowService:
 
     async def execute_workflow(
         self, skill_id: str, user_input: str, temp_path: Path
-    ) -> AsyncGenerator[str, None]:
+    ) -> AsyncGenerator[bytes, None]:
         """
         Execute a workflow and stream the results.
 
@@ -36,7 +39,7 @@ class WorkflowService:
             temp_path: Temporary folder path for execution
 
         Yields:
-            Server-Sent Events formatted strings
+            Server-Sent Events formatted frames (bytes)
         """
         # Generate run ID and create workflow run record
         run_id = str(uuid.uuid4())
@@ -45,6 +48,7 @@ class WorkflowService:
             user_input=user_input,
             status="running",
         )
+        execution_log: list[dict] = []
 
         try:
             # Create workflow run in database
@@ -53,14 +57,14 @@ class WorkflowService:
 
             # Send initial event with run_id
             start_event = {"type": "start", "run_id": run_id}
-            yield f"data: {json.dumps(start_event)}\n\n"
+            yield sse_event(start_event)
 
             # Verify skill exists
             skill = await self.skill_store.get_skill(skill_id)
             if not skill:
                 error_msg = f"Skill with ID '{skill_id}' not found"
                 error_event = {"type": "error", "error": error_msg}
-                yield f"data: {json.dumps(error_event)}\n\n"
+                yield sse_event(error_event)
                 await self.workflow_store.update_workflow_run(
                     run_id,
                     {
@@ -79,8 +83,7 @@ class WorkflowService:
             # Configure Claude Agent options
             options = get_workflow_agent_option(skill_id, temp_path)
 
-            execution_log = []
-            content_blocks = []
+            content_blocks = ContentBlockBuffer()
 
             # Execute workflow with Claude Agent SDK
             async with ClaudeSDKClient(options=options) as client:
@@ -95,42 +98,30 @@ class WorkflowService:
 
                     for ws_message in ws_messages:
                         # Stream to frontend (keep real-time streaming)
-                        yield f"data: {json.dumps(ws_message)}\n\n"
+                        yield sse_event(ws_message)
 
                         # Accumulate chunks using the same logic as agent_manager
-                        if ws_message["type"] in ["text", "thinking"]:
-                            # Append to last block of same type, or create new
-                            if (
-                                content_blocks
-                                and content_blocks[-1]["type"] == ws_message["type"]
-                            ):
-                                content_blocks[-1]["content"] += ws_message["content"]
-                            else:
-                                content_blocks.append(
-                                    {
-                                        "type": ws_message["type"],
-                                        "content": ws_message["content"],
-                                    }
-                                )
-                        elif ws_message["type"] in ["tool_use", "tool_result"]:
-                            # Add as new block (complete tool messages)
-                            content_blocks.append(ws_message)
+                        content_blocks.add(ws_message)
 
                 # Set execution log to complete content blocks
-                execution_log = content_blocks
+                execution_log = content_blocks.finalize()
 
             # Copy artifacts after execution completes
-            artifact_paths = copy_artifacts_from_temp_folder(temp_path, run_id)
+            # (in a worker thread, so the copies don't block other streams)
+            artifact_paths = await asyncio.to_thread(
+                copy_artifacts_from_temp_folder, temp_path, run_id
+            )
 
             # Update workflow run with completion
-            await self.workflow_store.update_workflow_run(
-                run_id,
-                {
-                    "status": "completed",
-                    "artifact_paths": artifact_paths,
-                    "execution_log": execution_log,
-                },
-            )
+            async with get_write_semaphore():
+                await self.workflow_store.update_workflow_run(
+                    run_id,
+                    {
+                        "status": "completed",
+                        "artifact_paths": artifact_paths,
+                        "execution_log": execution_log,
+                    },
+                )
 
             # Send completion event
             completion_data = {
@@ -138,29 +129,25 @@ class WorkflowService:
                 "run_id": run_id,
                 "artifact_paths": artifact_paths,
             }
-            yield f"data: {json.dumps(completion_data)}\n\n"
+            yield sse_event(completion_data)
 
         except Exception as e:
             error_msg = str(e)
 
             # Update workflow run with error
-            error_log = [
+            execution_log.append(
                 {
                     "type": "error",
                     "content": error_msg,
                     "timestamp": datetime.now(UTC).isoformat(),
                 }
-            ]
-            await self.workflow_store.update_workflow_run(
-                run_id,
-                {
-                    "status": "failed",
-                    "execution_log": execution_log + error_log
-                    if "execution_log" in locals()
-                    else error_log,
-                },
             )
+            async with get_write_semaphore():
+                await self.workflow_store.update_workflow_run(
+                    run_id,
+                    {"status": "failed", "execution_log": execution_log},
+                )
 
             # Send error event
             error_event = {"type": "error", "error": error_msg}
-            yield f"data: {json.dumps(error_event)}\n\n"
+            yield sse_event(error_event)
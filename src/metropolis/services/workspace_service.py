@@ -1,13 +1,17 @@
 """Service for workspace thread management with SSE streaming."""
 
-import json
-from datetime import UTC, datetime
+import asyncio
+import functools
+import logging
+import time
+from collections import OrderedDict
 from pathlib import Path
 from typing import AsyncGenerator, Optional
 from uuid import uuid4
 
-from claude_agent_sdk import ClaudeAgentOptions, ClaudeSDKClient
+from claude_agent_sdk import ClaudeAgentOptions, ClaudeSDKClient, ResultMessage
 
+from metropolis.db.client import get_write_semaphore
 from metropolis.db.models import (
     MessageRole,
     SessionMetadata,
@@ -21,8 +25,70 @@ from metropolis.db.workspace_thread_store import WorkspaceThreadStore
 from metropolis.dependencies.workspace_folder import get_execution_environment_folder
 from metropolis.services.jsonl_handler import JSONLHandler
 from metropolis.tools import skill_server
+from metropolis.utils.content_blocks import ContentBlockBuffer
+from metropolis.utils.sse import SSE_COMPLETE, sse_event
 from metropolis.utils.websocket_handler import StreamHandler
 
+logger = logging.getLogger(__name__)
+
+# Maximum number of per-environment JSONL handlers kept in memory
+JSONL_HANDLER_CACHE_SIZE = 1024
+
+
+@functools.lru_cache(maxsize=256)
+def _build_workspace_prompt(
+    name: str, description: str, skill_ids: tuple[str, ...]
+) -> str:
+    """
+    Build the workspace part of the appended system prompt.
+
+    Cached on the workspace fields it depends on, so it is only rebuilt after
+    a workspace is edited. The per-thread folder clause is added by the caller.
+
+    Args:
+        name: Workspace name
+        description: Workspace description
+        skill_ids: Skill IDs attached to the workspace
+
+    Returns:
+        System prompt text ending just before the working folder path
+    """
+    skills_text = "You have access to the following skills: " + " ".join(
+        f"skill id: {skill_id}" for skill_id in skill_ids
+    )
+    return (
+        f"""You are working in a workspace called """
+        f""""{name}".
+                    {description}
+
+                    You have access to the following skills and capabilities:
+
+                    {skills_text}
+
+                    Use these skills to help the user accomplish their tasks.
+                    Always work within the folder """
+    )
+
+
+def _turn_usage(result: Optional[ResultMessage]) -> dict:
+    """
+    Extract cost and token usage from a turn's ResultMessage.
+
+    Args:
+        result: The SDK result message, or None if none was received
+
+    Returns:
+        Keyword arguments for the assistant message and save_turn
+    """
+    if result is None:
+        return {}
+    usage = result.usage or {}
+    return {
+        "cost_usd": result.total_cost_usd,
+        "input_tokens": usage.get("input_tokens"),
+        "output_tokens": usage.get("output_tokens"),
+    }
+
 
 class WorkspaceService:
     """Service for managing workspace threads with SSE streaming."""
@@ -38,6 +104,79 @@ class WorkspaceService:
         self.skill_store = skill_store
         self.stream_handler = StreamHandler()
         self.jsonl_handler = JSONLHandler()
+        # JSONL handlers keyed by execution environment folder (LRU order)
+        self._jsonl_handlers: OrderedDict[str, JSONLHandler] = OrderedDict()
+        # In-flight background JSONL persists keyed by claude_session_id
+        self._pending_persists: dict[str, asyncio.Task] = {}
+        # Threads whose last persist failed: their local JSONL file is newer
+        # than MongoDB's copy and must not be overwritten by a restore
+        self._failed_persists: set[str] = set()
+
+    def _get_jsonl_handler(self, env_folder: Path) -> JSONLHandler:
+        """
+        Get the cached JSONL handler for an execution environment folder.
+
+        Args:
+            env_folder: The thread's execution environment folder
+
+        Returns:
+            JSONL handler rooted at the folder
+        """
+        key = str(env_folder)
+        handler = self._jsonl_handlers.get(key)
+        if handler is None:
+            handler = JSONLHandler(workspace_root=key)
+            self._jsonl_handlers[key] = handler
+            if len(self._jsonl_handlers) > JSONL_HANDLER_CACHE_SIZE:
+                self._jsonl_handlers.popitem(last=False)
+        else:
+            self._jsonl_handlers.move_to_end(key)
+        return handler
+
+    def _persist_jsonl_in_background(
+        self, jsonl_handler: JSONLHandler, claude_session_id: str
+    ) -> None:
+        """
+        Persist a thread's JSONL to MongoDB without blocking the SSE stream.
+
+        The task is tracked per thread so the next turn can wait for it before
+        restoring the JSONL file from MongoDB. A failed persist is remembered
+        so that restore is skipped and the local file is kept.
+
+        Args:
+            jsonl_handler: Handler bound to the thread's execution environment
+            claude_session_id: The Claude session ID
+        """
+
+        async def persist() -> None:
+            try:
+                async with get_write_semaphore():
+                    await jsonl_handler.persist_to_mongodb(
+                        claude_session_id, self.workspace_thread_store
+                    )
+            except Exception as e:
+                self._failed_persists.add(claude_session_id)
+                logger.error(
+                    "Error persisting JSONL for thread %s: %s", claude_session_id, e
+                )
+            else:
+                self._failed_persists.discard(claude_session_id)
+
+        task = asyncio.create_task(persist())
+        self._pending_persists[claude_session_id] = task
+
+        def forget(done: asyncio.Task) -> None:
+            if self._pending_persists.get(claude_session_id) is done:
+                del self._pending_persists[claude_session_id]
+
+        task.add_done_callback(forget)
+
+    async def wait_for_pending_persists(self):
+        """Wait for every in-flight background JSONL persist (e.g. on shutdown)."""
+        if self._pending_persists:
+            await asyncio.gather(
+                *self._pending_persists.values(), return_exceptions=True
+            )
 
     async def create_thread(
         self, workspace_id: str, title: Optional[str] = None
@@ -61,35 +200,25 @@ class WorkspaceService:
         # Return a placeholder that indicates thread creation is pending
         return "pending"
 
-    async def get_workspace_agent_options(
-        self, workspace_id: str, working_dir: Path, resume: Optional[str] = None
-    ) -> Optional[ClaudeAgentOptions]:
+    def get_workspace_agent_options(
+        self, workspace: Workspace, working_dir: Path, resume: Optional[str] = None
+    ) -> ClaudeAgentOptions:
         """
         Get Claude Agent options configured for a workspace.
 
-        Loads all workspace skills and includes them in the system prompt.
+        Includes all workspace skills in the system prompt.
 
         Args:
-            workspace_id: The workspace ID
+            workspace: The workspace, as already fetched by the caller
             working_dir: Working directory path for execution
             resume: Optional session ID to resume existing conversation
 
         Returns:
-            ClaudeAgentOptions configured with workspace skills, or None if
-            workspace not found
+            ClaudeAgentOptions configured with workspace skills
         """
-        workspace: Workspace | None = await self.workspace_store.get_workspace(
-            workspace_id
+        workspace_prompt = _build_workspace_prompt(
+            workspace.name, workspace.description, tuple(workspace.skill_ids)
         )
-        if not workspace:
-            return None
-
-        # Load all workspace skills
-        # skills_content = []
-        skills_text: str = ""
-        for skill_id in workspace.skill_ids:
-            skills_text += f" skill id: {skill_id}"
-        skills_text = f"You have access to the following skills: {skills_text}"
 
         # Build options with optional resume parameter
         options_dict = {
@@ -100,16 +229,7 @@ class WorkspaceService:
                 "type": "preset",
                 "preset": "claude_code",
                 "append": (
-                    f"""You are working in a workspace called """
-                    f""""{workspace.name}".
-                    {workspace.description}
-
-                    You have access to the following skills and capabilities:
-
-                    {skills_text}
-
-                    Use these skills to help the user accomplish their tasks.
-                    Always work within the folder {working_dir} and do not """
+                    f"""{workspace_prompt}{working_dir} and do not """
                     """work outside of it.
                     """
                 ),
@@ -135,7 +255,7 @@ class WorkspaceService:
         workspace_id: str,
         user_input: str,
         thread_id: Optional[str] = None,
-    ) -> AsyncGenerator[str, None]:
+    ) -> AsyncGenerator[bytes, None]:
         """
         Send a message in a workspace thread with SSE streaming.
 
@@ -146,7 +266,7 @@ class WorkspaceService:
                 None/"pending" for new thread
 
         Yields:
-            Server-Sent Events formatted strings
+            Server-Sent Events formatted frames (bytes)
         """
         try:
             # Verify workspace exists
@@ -155,11 +275,11 @@ class WorkspaceService:
             )
             if not workspace:
                 error_event = {"type": "error", "error": "Workspace not found"}
-                yield f"data: {json.dumps(error_event)}\n\n"
+                yield sse_event(error_event)
                 return
 
-            content_blocks = []
-            start_time = datetime.now(UTC)
+            content_blocks = ContentBlockBuffer()
+            start_ns = time.monotonic_ns()
 
             # Create or resume thread
             if thread_id and thread_id != "pending":
@@ -169,56 +289,54 @@ class WorkspaceService:
                 ) = await self.workspace_thread_store.get_thread(thread_id)
                 if not thread or thread.workspace_id != workspace_id:
                     error_event = {"type": "error", "error": "Thread not found"}
-                    yield f"data: {json.dumps(error_event)}\n\n"
+                    yield sse_event(error_event)
                     return
 
                 # Get execution environment folder
                 env_folder = get_execution_environment_folder(
                     thread.execution_environment
                 )
-                print(f"Resuming thread: {thread_id}")
-                print(f"Execution environment: {thread.execution_environment}")
-                print(f"Using folder: {env_folder}")
-
-                # Restore JSONL from MongoDB for session resumption
-                print(f"Restoring JSONL for thread: {thread_id}")
-
-                # Use JSONL handler with the execution environment folder
-                env_jsonl_handler = JSONLHandler(workspace_root=str(env_folder))
-                await env_jsonl_handler.restore_from_mongodb(
-                    thread_id, self.workspace_thread_store
+                logger.debug(
+                    "Resuming thread %s (execution environment %s, folder %s)",
+                    thread_id,
+                    thread.execution_environment,
+                    env_folder,
                 )
 
-                # Check if JSONL was restored
-                jsonl_lines: list[
-                    str
-                ] = await self.workspace_thread_store.get_jsonl_lines(thread_id)
-                print(f"JSONL lines restored: {len(jsonl_lines)} lines")
+                # Let the previous turn's JSONL persist finish before restoring
+                pending_persist = self._pending_persists.get(thread_id)
+                if pending_persist:
+                    await pending_persist
 
-                # Verify JSONL file exists
-                jsonl_file_path = env_jsonl_handler.get_session_file_path(thread_id)
-                print(f"JSONL file path: {jsonl_file_path}")
-                print(f"JSONL file exists: {jsonl_file_path.exists()}")
+                # Use JSONL handler with the execution environment folder
+                env_jsonl_handler = self._get_jsonl_handler(env_folder)
+
+                if thread_id in self._failed_persists:
+                    # MongoDB is missing the last turn; resume from the local
+                    # file (this turn's persist retries the upload)
+                    logger.warning(
+                        "Last JSONL persist failed for thread %s; "
+                        "keeping the local file",
+                        thread_id,
+                    )
+                else:
+                    # Restore JSONL from MongoDB for session resumption
+                    logger.debug("Restoring JSONL for thread: %s", thread_id)
+                    await env_jsonl_handler.restore_from_mongodb(
+                        thread_id, self.workspace_thread_store
+                    )
 
                 # Get agent options with resume parameter (resume = claude_session_id)
-                options: (
-                    ClaudeAgentOptions | None
-                ) = await self.get_workspace_agent_options(
-                    workspace_id, env_folder, resume=thread_id
+                options = self.get_workspace_agent_options(
+                    workspace, env_folder, resume=thread_id
                 )
-                if not options:
-                    error_event = {
-                        "type": "error",
-                        "error": "Failed to configure agent",
-                    }
-                    yield f"data: {json.dumps(error_event)}\n\n"
-                    return
 
                 # Create SDK client with resume option
                 async with ClaudeSDKClient(options=options) as client:
-                    # Save user message first
+                    # Build user message (saved with the assistant reply below);
+                    # reserve sequences for both messages of the turn
                     user_seq: int = await self.workspace_thread_store.get_next_sequence(
-                        thread_id
+                        thread_id, count=2
                     )
                     user_msg = WorkspaceMessage(
                         claude_session_id=thread_id,
@@ -226,63 +344,41 @@ class WorkspaceService:
                         role=MessageRole.USER,
                         content_blocks=[{"type": "text", "content": user_input}],
                     )
-                    await self.workspace_thread_store.save_message(user_msg)
-                    await self.workspace_thread_store.increment_message_count(thread_id)
 
                     # Send message
                     await client.query(user_input)
 
                     # Stream responses
+                    result_message = None
                     async for message in client.receive_response():
+                        if isinstance(message, ResultMessage):
+                            result_message = message
                         messages = self.stream_handler.process_message(message)
                         for msg in messages:
-                            yield f"data: {json.dumps(msg)}\n\n"
+                            yield sse_event(msg)
 
                             # Accumulate content blocks
-                            if msg["type"] in ["text", "thinking"]:
-                                if (
-                                    content_blocks
-                                    and content_blocks[-1]["type"] == msg["type"]
-                                ):
-                                    content_blocks[-1]["content"] += msg["content"]
-                                else:
-                                    content_blocks.append(
-                                        {"type": msg["type"], "content": msg["content"]}
-                                    )
-                            elif msg["type"] in ["tool_use", "tool_result"]:
-                                content_blocks.append(msg)
+                            content_blocks.add(msg)
 
                     # Save assistant message
-                    duration_ms = int(
-                        (datetime.now(UTC) - start_time).total_seconds() * 1000
-                    )
-                    assistant_seq: int = (
-                        await self.workspace_thread_store.get_next_sequence(thread_id)
-                    )
+                    duration_ms = (time.monotonic_ns() - start_ns) // 1_000_000
+                    usage = _turn_usage(result_message)
                     assistant_msg = WorkspaceMessage(
                         claude_session_id=thread_id,
-                        sequence=assistant_seq,
+                        sequence=user_seq + 1,
                         role=MessageRole.ASSISTANT,
-                        content_blocks=content_blocks,
+                        content_blocks=content_blocks.finalize(),
                         duration_ms=duration_ms,
+                        **usage,
                     )
-                    await self.workspace_thread_store.save_message(assistant_msg)
-                    await self.workspace_thread_store.increment_message_count(thread_id)
+                    async with get_write_semaphore():
+                        await self.workspace_thread_store.save_turn(
+                            thread_id, user_msg, assistant_msg, **usage
+                        )
 
                 # Persist JSONL to MongoDB after client exits (outside async with)
-                print(f"Persisting JSONL for thread: {thread_id}")
-
-                # Use JSONL handler with the execution environment folder
-                env_jsonl_handler = JSONLHandler(workspace_root=str(env_folder))
-                await env_jsonl_handler.persist_to_mongodb(
-                    thread_id, self.workspace_thread_store
-                )
-
-                # Check what was persisted
-                jsonl_lines_after: list[
-                    str
-                ] = await self.workspace_thread_store.get_jsonl_lines(thread_id)
-                print(f"JSONL lines persisted: {len(jsonl_lines_after)} lines")
+                logger.debug("Persisting JSONL for thread: %s", thread_id)
+                self._persist_jsonl_in_background(env_jsonl_handler, thread_id)
 
             else:
                 # Create new thread - generate execution_environment FIRST
@@ -290,45 +386,45 @@ class WorkspaceService:
                 execution_environment = str(uuid4())
                 env_folder = get_execution_environment_folder(execution_environment)
 
-                print("Creating new thread")
-                print(f"Execution environment: {execution_environment}")
-                print(f"Using folder: {env_folder}")
+                logger.debug(
+                    "Creating new thread (execution environment %s, folder %s)",
+                    execution_environment,
+                    env_folder,
+                )
 
                 # Get options without resume (new thread)
-                options_new: (
-                    ClaudeAgentOptions | None
-                ) = await self.get_workspace_agent_options(workspace_id, env_folder)
-                if not options_new:
-                    error_event = {
-                        "type": "error",
-                        "error": "Failed to configure agent",
-                    }
-                    yield f"data: {json.dumps(error_event)}\n\n"
-                    return
+                options_new = self.get_workspace_agent_options(workspace, env_folder)
 
                 async with ClaudeSDKClient(options=options_new) as client:
                     # Send first message
                     await client.query(user_input)
 
                     captured_session_id = None
+                    result_message = None
 
                     # Stream responses
                     async for message in client.receive_response():
-                        # Capture session ID using hasattr check
-                        if hasattr(message, "session_id") and not captured_session_id:
-                            session_id_value = message.session_id  # type: ignore
+                        if isinstance(message, ResultMessage):
+                            result_message = message
+
+                        # Capture session ID once; later chunks skip the lookup
+                        if captured_session_id is None:
+                            session_id_value = getattr(message, "session_id", None)
                             if session_id_value:
                                 captured_session_id = session_id_value
 
-                                print(
-                                    f"Captured claude_session_id: {captured_session_id}"
+                                logger.debug(
+                                    "Captured claude_session_id: %s",
+                                    captured_session_id,
                                 )
 
-                                # Create thread in database with both IDs
+                                # Create thread in database with both IDs;
+                                # this first turn takes sequences 0 and 1
                                 thread = WorkspaceThread(
                                     workspace_id=workspace_id,
                                     execution_environment=execution_environment,
                                     claude_session_id=captured_session_id,
+                                    next_seq=2,
                                     metadata=SessionMetadata(
                                         title=f"Thread in {workspace.name}"
                                     ),
@@ -341,99 +437,64 @@ class WorkspaceService:
                                     "type": "thread_created",
                                     "thread_id": captured_session_id,
                                 }
-                                yield f"data: {json.dumps(thread_event)}\n\n"
+                                yield sse_event(thread_event)
 
                         messages = self.stream_handler.process_message(message)
                         for msg in messages:
-                            yield f"data: {json.dumps(msg)}\n\n"
+                            yield sse_event(msg)
 
                             # Accumulate content blocks
-                            if msg["type"] in ["text", "thinking"]:
-                                if (
-                                    content_blocks
-                                    and content_blocks[-1]["type"] == msg["type"]
-                                ):
-                                    content_blocks[-1]["content"] += msg["content"]
-                                else:
-                                    content_blocks.append(
-                                        {"type": msg["type"], "content": msg["content"]}
-                                    )
-                            elif msg["type"] in ["tool_use", "tool_result"]:
-                                content_blocks.append(msg)
+                            content_blocks.add(msg)
 
                     # Save messages to database if we have a session
                     if captured_session_id:
-                        # Save user message
+                        # Build user message
                         user_msg = WorkspaceMessage(
                             claude_session_id=captured_session_id,
                             sequence=0,
                             role=MessageRole.USER,
                             content_blocks=[{"type": "text", "content": user_input}],
                         )
-                        await self.workspace_thread_store.save_message(user_msg)
 
-                        # Save assistant message
-                        duration_ms = int(
-                            (datetime.now(UTC) - start_time).total_seconds() * 1000
-                        )
+                        # Build assistant message
+                        duration_ms = (time.monotonic_ns() - start_ns) // 1_000_000
+                        usage = _turn_usage(result_message)
                         assistant_msg = WorkspaceMessage(
                             claude_session_id=captured_session_id,
                             sequence=1,
                             role=MessageRole.ASSISTANT,
-                            content_blocks=content_blocks,
+                            content_blocks=content_blocks.finalize(),
                             duration_ms=duration_ms,
+                            **usage,
                         )
-                        await self.workspace_thread_store.save_message(assistant_msg)
 
-                        # Update message count (2 messages: user + assistant)
-                        await self.workspace_thread_store.update_thread(
-                            captured_session_id, {"message_count": 2}
-                        )
+                        # Save both messages, message count and usage together
+                        async with get_write_semaphore():
+                            await self.workspace_thread_store.save_turn(
+                                captured_session_id, user_msg, assistant_msg, **usage
+                            )
 
                 # Persist JSONL to MongoDB after client exits
                 if captured_session_id:
-                    print(f"Persisting JSONL for new thread: {captured_session_id}")
-
-                    # Use JSONL handler with execution environment folder
-                    env_jsonl_handler = JSONLHandler(workspace_root=str(env_folder))
-
-                    # Check if JSONL file exists
-                    jsonl_file_path = env_jsonl_handler.get_session_file_path(
-                        captured_session_id
+                    logger.debug(
+                        "Persisting JSONL for new thread: %s", captured_session_id
                     )
-                    print(f"JSONL file path: {jsonl_file_path}")
-                    print(f"JSONL file exists: {jsonl_file_path.exists()}")
 
-                    # Persist to MongoDB
-                    await env_jsonl_handler.persist_to_mongodb(
-                        captured_session_id, self.workspace_thread_store
-                    )
-
-                    # Verify what was saved
-                    jsonl_lines_new: list[
-                        str
-                    ] = await self.workspace_thread_store.get_jsonl_lines(
-                        captured_session_id
-                    )
-                    print(
-                        f"JSONL lines persisted to MongoDB: "
-                        f"{len(jsonl_lines_new)} lines"
+                    # Use JSONL handler with execution environment folder
+                    env_jsonl_handler = self._get_jsonl_handler(env_folder)
+                    self._persist_jsonl_in_background(
+                        env_jsonl_handler, captured_session_id
                     )
 
             # Send completion event
-            completion_event = {"type": "complete"}
-            yield f"data: {json.dumps(completion_event)}\n\n"
+            yield SSE_COMPLETE
 
         except Exception as e:
-            import traceback
-
             error_msg = str(e)
-            traceback_msg = traceback.format_exc()
 
-            # Print to console for debugging
-            print(f"Error in chat_in_workspace: {error_msg}")
-            print(f"Traceback:\n{traceback_msg}")
+            # Log with traceback for debugging
+            logger.exception("Error in chat_in_workspace: %s", error_msg)
 
             # Stream error to frontend
             error_event = {"type": "error", "error": error_msg}
-            yield f"data: {json.dumps(error_event)}\n\n"
+            yield sse_event(error_event)
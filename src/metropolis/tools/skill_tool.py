@@ -1,3 +1,5 @@
+import time
+from collections import OrderedDict
 from datetime import datetime
 from typing import Any, Optional
 
@@ -6,54 +8,107 @@ from claude_agent_sdk import create_sdk_mcp_server, tool
 from pymongo import AsyncMongoClient
 
 from metropolis.config.settings import db_config
+from metropolis.db.client import get_mongo_client
+
+# Skills change rarely and are re-applied often, so tool lookups are cached.
+# Writes only invalidate the cache of the pod that served them, so the TTL is
+# how long other pods may keep serving a stale or deleted skill.
+SKILL_CACHE_TTL_SECONDS = 15.0
+SKILL_CACHE_MAX_SIZE = 256
 
 
 class SimpleSkillDB:
-    """Simple direct MongoDB access for skills."""
+    """
+    Simple direct MongoDB access for skills.
+
+    Lookups are cached per process. A skill write invalidates the cache of
+    the process that served it; other pods see the change within
+    SKILL_CACHE_TTL_SECONDS.
+    """
 
     def __init__(self):
         self.client: AsyncMongoClient | None = None
         self.collection = None
+        # skill_id -> (expires_at, skill), oldest entries first
+        self._skill_cache: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        # limit -> (expires_at, skills)
+        self._list_cache: dict[int, tuple[float, list[dict]]] = {}
+
+    def invalidate(self, skill_id: Optional[str] = None):
+        """
+        Drop cached skills after a write.
+
+        Args:
+            skill_id: Skill to drop from the lookup cache, or None for all.
+                Cached skill lists are always dropped.
+        """
+        if skill_id is None:
+            self._skill_cache.clear()
+        else:
+            self._skill_cache.pop(skill_id, None)
+        self._list_cache.clear()
 
     async def _ensure_connected(self):
-        """Ensure we have a database connection."""
-        if self.client is None:
-            self.client = AsyncMongoClient(db_config.uri)
+        """Ensure we use the shared connection for the running event loop."""
+        client = get_mongo_client()
+        if client is not self.client:
+            self.client = client
             db = self.client[db_config.database]
             self.collection = db["claude_agent_sdk_skills"]
 
     async def list_skills(self, limit: int = 100) -> list[dict]:
-        """List skills from the database."""
+        """List skill ids and titles (cached for SKILL_CACHE_TTL_SECONDS)."""
+        now = time.monotonic()
+        cached = self._list_cache.get(limit)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
         await self._ensure_connected()
         if self.collection is None:
             return []
-        cursor = self.collection.find({}).sort("created_at", -1).limit(limit)
-        skills = []
-        async for doc in cursor:
-            skills.append(
-                {
-                    "id": str(doc["_id"]),
-                    "title": doc.get("title", ""),
-                    "content": doc.get("content", ""),
-                    "created_at": doc.get("created_at", datetime.now()),
-                }
-            )
+        # Catalog fields only; skill bodies are fetched by get_skill when applied
+        cursor = (
+            self.collection.find({}, projection={"title": 1, "created_at": 1})
+            .sort("created_at", -1)
+            .limit(limit)
+        )
+        skills = [
+            {
+                "id": str(doc["_id"]),
+                "title": doc.get("title", ""),
+                "created_at": doc.get("created_at", datetime.now()),
+            }
+            for doc in await cursor.to_list(length=limit or None)
+        ]
+        self._list_cache[limit] = (now + SKILL_CACHE_TTL_SECONDS, skills)
         return skills
 
     async def get_skill(self, skill_id: str) -> Optional[dict]:
-        """Get a single skill by ID."""
+        """Get a single skill by ID (cached for SKILL_CACHE_TTL_SECONDS)."""
+        now = time.monotonic()
+        cached = self._skill_cache.get(skill_id)
+        if cached is not None:
+            expires_at, skill = cached
+            if expires_at > now:
+                return skill
+            del self._skill_cache[skill_id]
+
         await self._ensure_connected()
         if self.collection is None:
             return None
         try:
             doc = await self.collection.find_one({"_id": ObjectId(skill_id)})
             if doc:
-                return {
+                skill = {
                     "id": str(doc["_id"]),
                     "title": doc.get("title", ""),
                     "content": doc.get("content", ""),
                     "created_at": doc.get("created_at", datetime.now()),
                 }
+                self._skill_cache[skill_id] = (now + SKILL_CACHE_TTL_SECONDS, skill)
+                if len(self._skill_cache) > SKILL_CACHE_MAX_SIZE:
+                    self._skill_cache.popitem(last=False)
+                return skill
         except Exception as e:
             # Log the exception in a real application
             print(f"Error retrieving skill {skill_id}: {e}")
@@ -64,6 +119,16 @@ class SimpleSkillDB:
 _skill_db = SimpleSkillDB()
 
 
+def invalidate_skill_cache(skill_id: Optional[str] = None):
+    """
+    Drop cached skills used by the skill tools after a skill is written.
+
+    Args:
+        skill_id: Skill that changed, or None to drop every cached skill
+    """
+    _skill_db.invalidate(skill_id)
+
+
 # Define a custom tool using the @tool decorator
 @tool("list_skills", "list all skills", {})
 async def list_skills(args: dict[str, Any]) -> dict[str, Any]:
@@ -78,10 +143,9 @@ async def list_skills(args: dict[str, Any]) -> dict[str, Any]:
             return {"content": [{"type": "text", "text": "No skills available."}]}
 
         # Format skills as a readable list
-        skills_text = "Available skills:\n\n"
-        for skill in skills:
-            skills_text += f"• ID: {skill['id']}\n"
-            skills_text += f"  Title: {skill['title']}\n"
+        skills_text = "Available skills:\n\n" + "".join(
+            f"• ID: {skill['id']}\n  Title: {skill['title']}\n" for skill in skills
+        )
 
         return {"content": [{"type": "text", "text": skills_text}]}
     except Exception as e:
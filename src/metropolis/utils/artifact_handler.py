@@ -1,8 +1,41 @@
 """Utility for copying workflow artifacts from temp folders to permanent storage."""
 
+import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import List, Optional
+
+from metropolis.utils.file_utils import get_file_extension
+
+# Upper bound on concurrent artifact copies (copy2 releases the GIL in the
+# kernel copy, so a few threads overlap I/O without thrashing the disk)
+ARTIFACT_COPY_WORKERS = 4
+
+# Artifact file extensions to keep (lowercase, without dot)
+ARTIFACT_EXTENSIONS = frozenset(
+    ("pdf", "pptx", "txt", "md", "xls", "xlsx", "csv", "html")
+)
+
+
+def _copy_artifact(entry: os.DirEntry, destination_dir: Path) -> Optional[str]:
+    """
+    Copy one artifact into the destination directory.
+
+    Args:
+        entry: Directory entry of the artifact to copy
+        destination_dir: Directory to copy it into
+
+    Returns:
+        Destination path as string, or None if the copy failed
+    """
+    try:
+        dest_path = destination_dir / entry.name
+        shutil.copy2(entry.path, dest_path)
+        return str(dest_path)
+    except Exception as e:
+        print(f"Error copying {entry.name}: {e}")
+        return None
 
 
 def copy_artifacts_from_temp_folder(temp_path: Path, run_id: str) -> List[str]:
@@ -19,23 +52,14 @@ def copy_artifacts_from_temp_folder(temp_path: Path, run_id: str) -> List[str]:
     Returns:
         List of artifact file paths that were copied
     """
-    # Define allowed file extensions
-    allowed_extensions = {
-        ".pdf",
-        ".pptx",
-        ".txt",
-        ".md",
-        ".xls",
-        ".xlsx",
-        ".csv",
-        ".html",
-    }
-
-    # Find files with allowed extensions
-    files_to_copy = []
-    for file_path in temp_path.iterdir():
-        if file_path.is_file() and file_path.suffix.lower() in allowed_extensions:
-            files_to_copy.append(file_path)
+    # Find files with allowed extensions in one scandir pass (DirEntry caches
+    # the file type from readdir, and names are plain strings)
+    with os.scandir(temp_path) as entries:
+        files_to_copy = [
+            entry
+            for entry in entries
+            if get_file_extension(entry.name) in ARTIFACT_EXTENSIONS and entry.is_file()
+        ]
 
     # Skip copying if no matching files found
     if not files_to_copy:
@@ -46,14 +70,19 @@ def copy_artifacts_from_temp_folder(temp_path: Path, run_id: str) -> List[str]:
     destination_dir = artifacts_folder / run_id
     destination_dir.mkdir(parents=True, exist_ok=True)
 
-    # Copy matching files to destination
-    copied_files = []
-    for file_path in files_to_copy:
-        try:
-            dest_path = destination_dir / file_path.name
-            shutil.copy2(file_path, dest_path)
-            copied_files.append(str(dest_path))
-        except Exception as e:
-            print(f"Error copying {file_path.name}: {e}")
-
-    return copied_files
+    # Copy matching files to destination, overlapping copies when there are
+    # several (results keep the original file order)
+    if len(files_to_copy) == 1:
+        results = [_copy_artifact(files_to_copy[0], destination_dir)]
+    else:
+        workers = min(ARTIFACT_COPY_WORKERS, len(files_to_copy))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(
+                executor.map(
+                    _copy_artifact,
+                    files_to_copy,
+                    [destination_dir] * len(files_to_copy),
+                )
+            )
+
+    return [dest_path for dest_path in results if dest_path is not None]
@@ -0,0 +1,79 @@
+"""Accumulation of streamed messages into persisted content blocks."""
+
+from typing import Optional
+
+# Message types streamed as incremental chunks
+DELTA_MESSAGE_TYPES = frozenset(("text", "thinking"))
+
+# Message types that arrive as complete blocks
+TOOL_MESSAGE_TYPES = frozenset(("tool_use", "tool_result"))
+
+
+class ContentBlockBuffer:
+    """
+    Collects stream handler messages into content blocks.
+
+    Blocks are kept as parallel lists rather than one dict per block: a
+    text or thinking block is a list of chunks joined once in ``finalize()``
+    (instead of growing a string with ``+=`` on every chunk), and any other
+    block is stored as-is. Consecutive chunks of the open block are appended
+    to its chunk list directly, without looking at the previous block.
+    """
+
+    def __init__(self):
+        # One entry per block: its type, and either its chunk list (delta
+        # blocks) or the complete block dict (everything else)
+        self._types: list[str] = []
+        self._parts: list[Optional[list[str]]] = []
+        self._blocks: list[Optional[dict]] = []
+        # Type and chunk list of the delta block still being extended
+        self._open_type: Optional[str] = None
+        self._open_parts: list[str] = []
+
+    def add(self, json_msg: dict):
+        """
+        Accumulate a streamed message (same logic as frontend).
+
+        Args:
+            json_msg: JSON message produced by the stream handler
+        """
+        msg_type = json_msg["type"]
+        if msg_type in DELTA_MESSAGE_TYPES:
+            # Append to the open block of same type, or open a new one
+            if msg_type == self._open_type:
+                self._open_parts.append(json_msg["content"])
+            else:
+                self._open_type = msg_type
+                self._open_parts = [json_msg["content"]]
+                self._types.append(msg_type)
+                self._parts.append(self._open_parts)
+                self._blocks.append(None)
+        elif msg_type in TOOL_MESSAGE_TYPES:
+            # Add as new block (complete tool messages)
+            self.add_block(json_msg)
+
+    def add_block(self, block: dict):
+        """
+        Append a complete block, closing any open text or thinking block.
+
+        Args:
+            block: Content block to store as-is
+        """
+        self._open_type = None
+        self._types.append(block["type"])
+        self._parts.append(None)
+        self._blocks.append(block)
+
+    def finalize(self) -> list[dict]:
+        """
+        Join buffered parts into complete content blocks.
+
+        Returns:
+            Content blocks ready to persist
+        """
+        return [
+            block if parts is None else {"type": block_type, "content": "".join(parts)}
+            for block_type, parts, block in zip(
+                self._types, self._parts, self._blocks, strict=True
+            )
+        ]
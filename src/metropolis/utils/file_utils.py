@@ -1,8 +1,8 @@
 """File validation and utility functions."""
 
+import functools
 import mimetypes
 import os
-from pathlib import Path
 
 ALLOWED_FILE_TYPES = {
     "pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
@@ -16,6 +16,19 @@ ALLOWED_FILE_TYPES = {
 
 MAX_FILE_SIZE = 16 * 1024 * 1024  # 16 MB
 
+# Load the system MIME database once at import rather than on the first
+# lookup, then merge it with our own types into a single extension table
+mimetypes.init()
+_MIME_TYPES_BY_EXT = {
+    ext[1:]: mime_type for ext, mime_type in mimetypes.types_map.items()
+} | ALLOWED_FILE_TYPES
+
+# Characters stripped by sanitize_filename: path separators and null bytes
+_UNSAFE_FILENAME_CHARS = str.maketrans("", "", "/\\\0")
+
+# Units for format_file_size, one per power of 1024
+_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB")
+
 
 def get_file_extension(filename: str) -> str:
     """
@@ -27,7 +40,13 @@ def get_file_extension(filename: str) -> str:
     Returns:
         File extension in lowercase without dot
     """
-    return Path(filename).suffix.lstrip(".").lower()
+    # Same rules as Path.suffix (last path component; a leading or trailing
+    # dot is not an extension) without building a Path object
+    name = filename.rstrip("/").rpartition("/")[2]
+    dot = name.rfind(".")
+    if 0 < dot < len(name) - 1:
+        return name[dot + 1 :].lower()
+    return ""
 
 
 def validate_file_type(file_ext: str) -> bool:
@@ -66,20 +85,12 @@ def sanitize_filename(filename: str) -> str:
     Returns:
         Sanitized filename
     """
-    # Get just the basename (removes any path)
-    name = os.path.basename(filename)
-
-    # Remove any remaining path separators
-    name = name.replace("/", "").replace("\\", "")
-
-    # Remove null bytes
-    name = name.replace("\0", "")
+    # Get just the basename (removes any path), then drop any remaining path
+    # separators and null bytes in a single translate pass
+    name = os.path.basename(filename).translate(_UNSAFE_FILENAME_CHARS)
 
     # If empty after sanitization, use default
-    if not name:
-        name = "unnamed_file"
-
-    return name
+    return name or "unnamed_file"
 
 
 def get_mime_type(filename: str) -> str:
@@ -92,14 +103,27 @@ def get_mime_type(filename: str) -> str:
     Returns:
         MIME type string
     """
-    ext = get_file_extension(filename)
+    return get_mime_type_by_ext(get_file_extension(filename))
+
+
+@functools.lru_cache(maxsize=4096)
+def get_mime_type_by_ext(ext: str) -> str:
+    """
+    Get MIME type for a file extension (memoized).
+
+    Args:
+        ext: File extension in lowercase without dot
 
-    # Try our known types first
-    if ext in ALLOWED_FILE_TYPES:
-        return ALLOWED_FILE_TYPES[ext]
+    Returns:
+        MIME type string
+    """
+    # Our known types take precedence over the system table
+    mime_type = _MIME_TYPES_BY_EXT.get(ext)
+    if mime_type:
+        return mime_type
 
-    # Fallback to mimetypes module
-    mime_type, _ = mimetypes.guess_type(filename)
+    # Fallback to mimetypes module for suffix aliases such as "tgz"
+    mime_type, _ = mimetypes.guess_type(f"file.{ext}")
     return mime_type or "application/octet-stream"
 
 
@@ -113,9 +137,6 @@ def format_file_size(size_bytes: int) -> str:
     Returns:
         Formatted file size string (e.g., "1.5 MB")
     """
-    size = float(size_bytes)
-    for unit in ["B", "KB", "MB", "GB"]:
-        if size < 1024.0:
-            return f"{size:.1f} {unit}"
-        size /= 1024.0
-    return f"{size:.1f} TB"
+    # Unit index straight from the bit length: each unit is 10 more bits
+    index = min((max(int(size_bytes), 1).bit_length() - 1) // 10, 4)
+    return f"{size_bytes / (1 << (10 * index)):.1f} {_SIZE_UNITS[index]}"
@@ -0,0 +1,35 @@
+"""Compact JSON encoding for streamed messages."""
+
+import json
+from typing import Any
+
+# Reused encoder: compact separators and raw UTF-8 keep frames small, and a
+# single instance avoids rebuilding the encoder for every streamed token
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+# Pre-encoded heads for the per-token delta messages, which make up nearly
+# every message of a streamed reply; only the content string is encoded
+_DELTA_HEADS = {
+    kind: '{"type":"' + kind + '","content":' for kind in ("text", "thinking")
+}
+
+
+def encode_json(data: Any) -> str:
+    """
+    Encode a streamed message as compact JSON.
+
+    Text and thinking deltas (``{"type": ..., "content": str}``) take a fast
+    path that only encodes the content string.
+
+    Args:
+        data: JSON-serializable payload
+
+    Returns:
+        JSON text
+    """
+    if type(data) is dict and len(data) == 2:
+        head = _DELTA_HEADS.get(data.get("type"))
+        content = data.get("content")
+        if head is not None and type(content) is str:
+            return head + _encoder.encode(content) + "}"
+    return _encoder.encode(data)
@@ -1,8 +1,15 @@
-from typing import Any
+import sys
+from typing import Any, Optional
 
 from claude_agent_sdk import AssistantMessage, UserMessage
 from claude_agent_sdk.types import StreamEvent, ToolResultBlock, ToolUseBlock
 
+# Stream events after which deltas held in stdout's buffer are flushed
+BLOCK_END_EVENT_TYPES = frozenset(("content_block_stop", "message_stop"))
+
+# Message types whose color is still active after they are printed
+COLORED_STREAM_TYPES = frozenset(("thinking", "assistant"))
+
 
 class StreamPrintHandler:
     """Handler for printing streaming messages with colored formatting."""
@@ -14,14 +21,79 @@ class StreamPrintHandler:
     TOOL_RESULT_COLOR = "\033[93m"  # Yellow
     RESET_COLOR = "\033[0m"
 
-    def __init__(self, use_colors: bool = True):
+    # Headers written when a thinking or assistant block starts
+    THINKING_PREFIX = "\n    Claude (thinking): "
+    ASSISTANT_PREFIX = "\nClaude (assistant): "
+    _THINKING_HEADER = THINKING_COLOR + THINKING_PREFIX
+    _ASSISTANT_HEADER = ASSISTANT_COLOR + ASSISTANT_PREFIX
+    # Thinking text is gray, so its color is reset before the assistant's
+    _ASSISTANT_HEADER_AFTER_THINKING = RESET_COLOR + _ASSISTANT_HEADER
+
+    # Values last_message_type can take
+    _MESSAGE_TYPES = (None, "thinking", "assistant", "tool_use", "tool_result")
+
+    def __init__(self, use_colors: bool = True, low_latency: Optional[bool] = None):
         """Initialize the print handler.
 
         Args:
             use_colors: Whether to use ANSI colors for output
+            low_latency: Flush after every delta instead of at the end of each
+                content block. Defaults to True when stdout is a terminal.
         """
         self.use_colors = use_colors
         self.last_message_type: str | None = None
+        # Header written before a thinking or assistant delta, keyed by
+        # (previous message type, new type); empty while a block continues
+        if use_colors:
+            thinking_header = self._THINKING_HEADER
+            assistant_header = self._ASSISTANT_HEADER
+            assistant_after_thinking = self._ASSISTANT_HEADER_AFTER_THINKING
+        else:
+            thinking_header = self.THINKING_PREFIX
+            assistant_header = assistant_after_thinking = self.ASSISTANT_PREFIX
+        self._block_headers: dict[tuple[str | None, str], str] = {}
+        for last_type in self._MESSAGE_TYPES:
+            self._block_headers[last_type, "thinking"] = (
+                "" if last_type == "thinking" else thinking_header
+            )
+            self._block_headers[last_type, "assistant"] = (
+                ""
+                if last_type == "assistant"
+                else assistant_after_thinking
+                if last_type == "thinking"
+                else assistant_header
+            )
+        # Handler per SDK message type, looked up by exact type
+        self._handlers = {
+            StreamEvent: self._process_stream_event,
+            AssistantMessage: self._process_assistant_message,
+            UserMessage: self._process_user_message,
+        }
+        # Text field and printer per streamed delta type
+        self._delta_printers = {
+            "thinking_delta": ("thinking", self._print_thinking),
+            "text_delta": ("text", self._print_assistant),
+        }
+        # Deltas are flushed one by one only for a live terminal; otherwise
+        # output stays in stdout's buffer until a content block ends
+        if low_latency is None:
+            low_latency = sys.stdout.isatty()
+        self._flush_deltas = low_latency
+
+    def _write(self, text: str) -> None:
+        """Write text to the current stdout in a single call.
+
+        sys.stdout is looked up on every write so redirect_stdout and
+        replaced streams are honored.
+
+        Args:
+            text: Text to write
+        """
+        sys.stdout.write(text)
+
+    def _flush(self) -> None:
+        """Flush the current stdout."""
+        sys.stdout.flush()
 
     def process_message(self, message: Any) -> None:
         """Process and print any message type with appropriate formatting.
@@ -29,12 +101,16 @@ class StreamPrintHandler:
         Args:
             message: Message from the Claude SDK (StreamEvent, AssistantMessage, etc.)
         """
-        if isinstance(message, StreamEvent):
-            self._process_stream_event(message)
-        elif isinstance(message, AssistantMessage):
-            self._process_assistant_message(message)
-        elif isinstance(message, UserMessage):
-            self._process_user_message(message)
+        handler = self._handlers.get(type(message))
+        if handler is None:
+            # Slow path for subclasses of the SDK message types
+            for message_type, candidate in self._handlers.items():
+                if isinstance(message, message_type):
+                    handler = candidate
+                    break
+            else:
+                return
+        handler(message)
 
     def process_stream_event(self, message: StreamEvent) -> None:
         """Process and print a stream event with appropriate formatting.
@@ -46,20 +122,21 @@ class StreamPrintHandler:
 
     def _process_stream_event(self, message: StreamEvent) -> None:
         """Internal method to process stream events."""
-        if not isinstance(message, StreamEvent):
-            return
-
         event = message.event
-        if event.get("type") != "content_block_delta":
+        event_type = event.get("type")
+        if event_type != "content_block_delta":
+            # Flush buffered deltas once the block or message is complete
+            if event_type in BLOCK_END_EVENT_TYPES and not self._flush_deltas:
+                self._flush()
             return
 
-        delta = event.get("delta", {})
-        delta_type = delta.get("type")
-
-        if delta_type == "thinking_delta":
-            self._print_thinking(delta.get("thinking", ""))
-        elif delta_type == "text_delta":
-            self._print_assistant(delta.get("text", ""))
+        delta = event.get("delta")
+        if delta is None:
+            return
+        printer = self._delta_printers.get(delta.get("type"))
+        if printer is not None:
+            field, print_delta = printer
+            print_delta(delta.get(field, ""))
 
     def _process_assistant_message(self, message: AssistantMessage) -> None:
         """Process AssistantMessage for tool use blocks."""
@@ -79,22 +156,10 @@ class StreamPrintHandler:
         Args:
             text: The thinking text chunk to print
         """
-        if self.last_message_type != "thinking":
-            prefix = "\n    Claude (thinking): "
-            if self.use_colors:
-                print(
-                    f"{self.THINKING_COLOR}{prefix}",
-                    end="",
-                    flush=True,
-                )
-            else:
-                print(prefix, end="", flush=True)
-            self.last_message_type = "thinking"
-
-        if self.use_colors:
-            print(f"{text}", end="", flush=True)
-        else:
-            print(text, end="", flush=True)
+        self._write(self._block_headers[self.last_message_type, "thinking"] + text)
+        self.last_message_type = "thinking"
+        if self._flush_deltas:
+            self._flush()
 
     def _print_assistant(self, text: str) -> None:
         """Print assistant text with appropriate formatting and color.
@@ -102,23 +167,10 @@ class StreamPrintHandler:
         Args:
             text: The assistant text chunk to print
         """
-        if self.last_message_type != "assistant":
-            # Reset color before assistant message if we were in thinking mode
-            if self.last_message_type == "thinking" and self.use_colors:
-                print(self.RESET_COLOR, end="", flush=True)
-
-            prefix = "\nClaude (assistant): "
-            if self.use_colors:
-                print(
-                    f"{self.ASSISTANT_COLOR}{prefix}",
-                    end="",
-                    flush=True,
-                )
-            else:
-                print(prefix, end="", flush=True)
-            self.last_message_type = "assistant"
-
-        print(text, end="", flush=True)
+        self._write(self._block_headers[self.last_message_type, "assistant"] + text)
+        self.last_message_type = "assistant"
+        if self._flush_deltas:
+            self._flush()
 
     def _print_tool_use(self, block: ToolUseBlock) -> None:
         """Print tool use block with appropriate formatting and color.
@@ -126,26 +178,25 @@ class StreamPrintHandler:
         Args:
             block: ToolUseBlock containing tool name and input
         """
-        # Reset previous color if needed
-        if self.use_colors and self.last_message_type is not None:
-            print(self.RESET_COLOR, end="", flush=True)
-
-        if self.use_colors:
-            print(
-                f"\n{self.TOOL_USE_COLOR}🔧 Tool Use: {block.name}{self.RESET_COLOR}",
-                flush=True,
-            )
-        else:
-            print(f"\n🔧 Tool Use: {block.name}", flush=True)
-
         # Special handling for TodoWrite tool
         if block.name == "TodoWrite" and "todos" in block.input:
-            self._print_todo_table(block.input["todos"])
-        else:
             if self.use_colors:
-                print(f"{self.TOOL_USE_COLOR}Input: {block.input}{self.RESET_COLOR}")
+                text = (
+                    f"{self._reset_open_color()}\n{self.TOOL_USE_COLOR}"
+                    f"🔧 Tool Use: {block.name}{self.RESET_COLOR}\n"
+                )
             else:
-                print(f"Input: {block.input}")
+                text = f"\n🔧 Tool Use: {block.name}\n"
+            self._write(text + self._format_todo_table(block.input["todos"]))
+        elif self.use_colors:
+            # Header and input share a color, set once for both lines
+            self._write(
+                f"{self._reset_open_color()}\n{self.TOOL_USE_COLOR}"
+                f"🔧 Tool Use: {block.name}\nInput: {block.input}{self.RESET_COLOR}\n"
+            )
+        else:
+            self._write(f"\n🔧 Tool Use: {block.name}\nInput: {block.input}\n")
+        self._flush()
 
         self.last_message_type = "tool_use"
 
@@ -155,35 +206,51 @@ class StreamPrintHandler:
         Args:
             block: ToolResultBlock containing tool result content
         """
-        # Reset previous color if needed
-        if self.use_colors and self.last_message_type is not None:
-            print(self.RESET_COLOR, end="", flush=True)
-
         content_preview = str(block.content)
         # Truncate long content for readability
         # if len(content_preview) > 500:
         #     content_preview = content_preview[:500] + "..."
 
         if self.use_colors:
-            print(
-                f"\n{self.TOOL_RESULT_COLOR}📊 Tool Result:{self.RESET_COLOR}",
-                flush=True,
+            # Header and content share a color, set once for both
+            self._write(
+                f"{self._reset_open_color()}\n{self.TOOL_RESULT_COLOR}📊 Tool Result:\n"
+                f"{content_preview}{self.RESET_COLOR}\n"
             )
-            print(f"{self.TOOL_RESULT_COLOR}{content_preview}{self.RESET_COLOR}")
         else:
-            print("\n📊 Tool Result:", flush=True)
-            print(content_preview)
+            self._write(f"\n📊 Tool Result:\n{content_preview}\n")
+        self._flush()
 
         self.last_message_type = "tool_result"
 
-    def _print_todo_table(self, todos: list[dict]) -> None:
-        """Print todo list in a nicely formatted table.
+    def _reset_open_color(self) -> str:
+        """Return the reset code if the previous output left its color on.
+
+        Thinking and assistant text stay colored while their block streams;
+        tool output always ends with its own reset.
+
+        Returns:
+            RESET_COLOR, or an empty string when no color is active
+        """
+        if self.last_message_type in COLORED_STREAM_TYPES:
+            return self.RESET_COLOR
+        return ""
+
+    def _format_todo_table(self, todos: list[dict]) -> str:
+        """Format todo list as a nicely formatted table.
+
+        The table is returned as one string so it is written with a single
+        call together with the tool use header.
 
         Args:
             todos: List of todo dictionaries with status, content, etc.
+
+        Returns:
+            The table text, one trailing newline per line
         """
         if not todos:
-            return
+            return ""
+        lines = []
 
         # Calculate statistics
         completed = len([t for t in todos if t["status"] == "completed"])
@@ -193,14 +260,14 @@ class StreamPrintHandler:
 
         # Progress header
         if self.use_colors:
-            print(
+            lines.append(
                 f"\n{self.TOOL_USE_COLOR}📋 Todo Progress: "
                 f"{completed}/{total} completed, "
                 f"{in_progress} in progress, "
                 f"{pending} pending{self.RESET_COLOR}"
             )
         else:
-            print(
+            lines.append(
                 f"\n📋 Todo Progress: "
                 f"{completed}/{total} completed, "
                 f"{in_progress} in progress, "
@@ -216,16 +283,22 @@ class StreamPrintHandler:
             percentage = int(progress_ratio * 100)
 
             if self.use_colors:
-                print(f"{self.TOOL_USE_COLOR}[{bar}] {percentage}%{self.RESET_COLOR}")
+                lines.append(
+                    f"{self.TOOL_USE_COLOR}[{bar}] {percentage}%{self.RESET_COLOR}"
+                )
             else:
-                print(f"[{bar}] {percentage}%")
+                lines.append(f"[{bar}] {percentage}%")
 
         # Table header
-        print(
+        lines.append(
             "\n┌─────┬─────────────┬─────────────────────────────────────────────────┐"
         )
-        print("│  #  │   Status    │                    Task                         │")
-        print("├─────┼─────────────┼─────────────────────────────────────────────────┤")
+        lines.append(
+            "│  #  │   Status    │                    Task                         │"
+        )
+        lines.append(
+            "├─────┼─────────────┼─────────────────────────────────────────────────┤"
+        )
 
         # Table rows
         for i, todo in enumerate(todos, 1):
@@ -253,24 +326,27 @@ class StreamPrintHandler:
 
             reset = self.RESET_COLOR if self.use_colors else ""
 
-            print(
+            lines.append(
                 f"│ {i:2d}  │ {color}{icon} {status_text:<8}{reset} │ "
                 f"{color}{content:<47}{reset} │"
             )
 
         # Table footer
-        print("└─────┴─────────────┴─────────────────────────────────────────────────┘")
+        lines.append(
+            "└─────┴─────────────┴─────────────────────────────────────────────────┘"
+        )
+        lines.append("")
+        return "\n".join(lines)
 
     def reset(self) -> None:
         """Reset the handler state and colors."""
         if self.use_colors and self.last_message_type is not None:
-            print(self.RESET_COLOR, end="", flush=True)
+            self._write(self.RESET_COLOR)
+            self._flush()
         self.last_message_type = None
 
     def finalize(self) -> None:
         """Finalize output by printing newline and resetting colors."""
-        if self.use_colors:
-            print(self.RESET_COLOR)
-        else:
-            print()
+        self._write(self.RESET_COLOR + "\n" if self.use_colors else "\n")
+        self._flush()
         self.last_message_type = None
@@ -0,0 +1,66 @@
+"""Interactive terminal chat loop shared by the example scripts."""
+
+import asyncio
+from typing import Any, Callable, Coroutine, Optional
+
+from claude_agent_sdk import ClaudeAgentOptions, ClaudeSDKClient
+
+from metropolis.utils.partial_messages import StreamPrintHandler
+
+# Prompt that ends the chat
+EXIT_COMMAND = "exit"
+
+
+async def run_repl(
+    options: ClaudeAgentOptions,
+    after_turn: Optional[Callable[[], None]] = None,
+    on_exit: Optional[Callable[[], None]] = None,
+):
+    """
+    Chat with an agent from the terminal until the user types ``exit``.
+
+    Responses are printed as they stream in by a single StreamPrintHandler.
+
+    Args:
+        options: ClaudeAgentOptions for the SDK client
+        after_turn: Called after each response (e.g. to copy artifacts)
+        on_exit: Called once when the user exits (e.g. to clean up)
+    """
+    async with ClaudeSDKClient(options=options) as client:
+        print_handler = StreamPrintHandler(use_colors=True)
+
+        while True:
+            prompt = input("You: ")
+            if prompt == EXIT_COMMAND:
+                if on_exit is not None:
+                    on_exit()
+                break
+
+            await client.query(prompt)
+
+            # Process response - handles all message types
+            async for message in client.receive_response():
+                print_handler.process_message(message)
+
+            print_handler.finalize()
+
+            if after_turn is not None:
+                after_turn()
+
+
+def run(main: Coroutine[Any, Any, None]):
+    """
+    Run an example's main coroutine, on uvloop when it is installed.
+
+    uvloop ships with ``uvicorn[standard]``, which the API server already
+    picks up through uvicorn's default ``loop="auto"``.
+
+    Args:
+        main: Coroutine to run to completion
+    """
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main)
+    else:
+        uvloop.run(main)
@@ -0,0 +1,97 @@
+"""Server-Sent Events formatting helpers."""
+
+import asyncio
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, Optional
+
+from metropolis.utils.json_encoding import encode_json
+
+# Upper bound on the size of one coalesced write
+SSE_COALESCE_MAX_BYTES = 16 * 1024
+
+# Frames buffered ahead of the socket before the producer is paused
+SSE_COALESCE_QUEUE_SIZE = 256
+
+# Shared Server-Sent Events response settings
+SSE_MEDIA_TYPE = "text/event-stream"
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "*",
+}
+
+
+def sse_event(data: Any) -> bytes:
+    """
+    Format a JSON-serializable payload as an SSE ``data:`` frame.
+
+    Args:
+        data: Payload to send
+
+    Returns:
+        UTF-8 encoded frame, ready to yield to a StreamingResponse
+    """
+    return b"data: " + encode_json(data).encode() + b"\n\n"
+
+
+# Frame closing every successful stream
+SSE_COMPLETE = sse_event({"type": "complete"})
+
+
+async def coalesce_sse(
+    events: AsyncGenerator[bytes, None],
+    max_bytes: int = SSE_COALESCE_MAX_BYTES,
+) -> AsyncGenerator[bytes, None]:
+    """
+    Merge SSE frames that are already waiting into a single write.
+
+    The source is read by a producer task into a bounded queue. Each write
+    takes the next frame plus whatever else is queued (up to ``max_bytes``),
+    so a burst of token frames goes out as one chunk, while a lone frame is
+    sent immediately instead of waiting on a flush timer. The source stream is
+    closed by the producer task that iterated it.
+
+    Args:
+        events: Stream of encoded SSE frames
+        max_bytes: Stop merging once a chunk reaches this size
+
+    Yields:
+        One or more concatenated SSE frames
+    """
+    queue: asyncio.Queue[Optional[bytes]] = asyncio.Queue(
+        maxsize=SSE_COALESCE_QUEUE_SIZE
+    )
+
+    async def produce():
+        try:
+            async with aclosing(events):
+                async for event in events:
+                    await queue.put(event)
+        finally:
+            # Wake the consumer unless it is the one that cancelled us
+            if not asyncio.current_task().cancelling():
+                await queue.put(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        done = False
+        while not done:
+            event = await queue.get()
+            if event is None:
+                break
+            chunk = [event]
+            size = len(event)
+            while size < max_bytes and not queue.empty():
+                event = queue.get_nowait()
+                if event is None:
+                    done = True
+                    break
+                chunk.append(event)
+                size += len(event)
+            yield b"".join(chunk)
+        # Surface any error raised by the source stream
+        await producer
+    finally:
+        if not producer.done():
+            producer.cancel()
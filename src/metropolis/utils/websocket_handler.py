@@ -1,8 +1,32 @@
+import json
 from typing import Any
 
 from claude_agent_sdk import AssistantMessage, UserMessage
 from claude_agent_sdk.types import StreamEvent, ToolResultBlock, ToolUseBlock
 
+# Streamed delta type -> message type, which is also the delta's text field
+_DELTA_MESSAGE_TYPES = {"thinking_delta": "thinking", "text_delta": "text"}
+
+
+def _tool_result_text(content: Any) -> str:
+    """Flatten tool result content into display text.
+
+    Args:
+        content: ToolResultBlock content (a string, a list of content blocks or None)
+
+    Returns:
+        Plain text for text content, otherwise compact JSON
+    """
+    if isinstance(content, str):
+        return content
+    if content is None:
+        return ""
+    if isinstance(content, list) and all(
+        isinstance(item, dict) and item.get("type") == "text" for item in content
+    ):
+        return "".join(item.get("text", "") for item in content)
+    return json.dumps(content, default=str)
+
 
 class StreamHandler:
     """
@@ -25,36 +49,31 @@ class StreamHandler:
         Returns:
             List of JSON-serializable dictionaries to send via WebSocket
         """
-        if isinstance(message, StreamEvent):
-            return self._process_stream_event(message)
-        elif isinstance(message, AssistantMessage):
-            return self._process_assistant_message(message)
-        elif isinstance(message, UserMessage):
-            return self._process_user_message(message)
-        return []
+        match message:
+            case StreamEvent():
+                return self._process_stream_event(message)
+            case AssistantMessage():
+                return self._process_assistant_message(message)
+            case UserMessage():
+                return self._process_user_message(message)
+            case _:
+                return []
 
     def _process_stream_event(self, message: StreamEvent) -> list[dict[str, Any]]:
-        """Internal method to process stream events."""
-        if not isinstance(message, StreamEvent):
-            return []
-
+        """Internal method to process stream events (type checked by the caller)."""
         event = message.event
         if event.get("type") != "content_block_delta":
             return []
 
+        # One lookup maps the delta type to both the delta field holding the
+        # chunk and the outgoing message type (they share the same name)
         delta = event.get("delta", {})
-        delta_type = delta.get("type")
-
-        if delta_type == "thinking_delta":
-            thinking_text = delta.get("thinking", "")
-            if thinking_text:
-                self.last_message_type = "thinking"
-                return [{"type": "thinking", "content": thinking_text}]
-        elif delta_type == "text_delta":
-            text = delta.get("text", "")
-            if text:
-                self.last_message_type = "text"
-                return [{"type": "text", "content": text}]
+        msg_type = _DELTA_MESSAGE_TYPES.get(delta.get("type"))
+        if msg_type is not None:
+            chunk = delta.get(msg_type)
+            if chunk:
+                self.last_message_type = msg_type
+                return [{"type": msg_type, "content": chunk}]
 
         return []
 
@@ -116,7 +135,7 @@ class StreamHandler:
 
         return {
             "type": "tool_result",
-            "content": str(block.content),
+            "content": _tool_result_text(block.content),
             "toolCallId": tool_use_id,
         }
 
@@ -28,14 +28,12 @@ def test_hooks_configuration():
     assert len(post_tool_hooks) > 0, "❌ No PostToolUse hook matchers"
     print(f"✅ {len(post_tool_hooks)} PostToolUse hook matcher(s) found")
 
-    # Check validate_deck_on_write is in the hooks
-    first_matcher = post_tool_hooks[0]
-    assert hasattr(first_matcher, "hooks"), "❌ HookMatcher missing 'hooks' attribute"
-
-    hook_functions = first_matcher.hooks
-    assert validate_deck_on_write in hook_functions, (
-        "❌ validate_deck_on_write not found in hooks"
-    )
+    # Check validate_deck_on_write is in the hooks (single pass, by identity)
+    assert any(
+        hook is validate_deck_on_write
+        for matcher in post_tool_hooks
+        for hook in matcher.hooks
+    ), "❌ validate_deck_on_write not found in hooks"
     print("✅ validate_deck_on_write hook properly registered")
 
     print("\n" + "=" * 80)
@@ -29,7 +29,7 @@ async def test_with_real_session():
     print(f"   Session file: {jsonl_handler.get_session_file_path(test_session_id)}")
 
     print("\n2. Reading local JSONL file...")
-    lines = jsonl_handler.read_jsonl_file(test_session_id)
+    lines = await asyncio.to_thread(jsonl_handler.read_jsonl_file, test_session_id)
     print(f"   Found {len(lines)} lines")
 
     if len(lines) > 0:
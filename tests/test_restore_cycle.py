@@ -24,12 +24,14 @@ async def test_restore_cycle():
     test_session_id = "4ce6417b-7948-406e-bcbb-90a2c2000122"
     session_file = jsonl_handler.get_session_file_path(test_session_id)
 
+    # Both steps only read the local file, so run them concurrently
     print("\n1. Reading original file...")
-    original_lines = jsonl_handler.read_jsonl_file(test_session_id)
-    print(f"   Original has {len(original_lines)} lines")
-
     print("\n2. Persisting to MongoDB...")
-    await jsonl_handler.persist_to_mongodb(test_session_id, session_store)
+    original_lines, _ = await asyncio.gather(
+        asyncio.to_thread(jsonl_handler.read_jsonl_file, test_session_id),
+        jsonl_handler.persist_to_mongodb(test_session_id, session_store),
+    )
+    print(f"   Original has {len(original_lines)} lines")
     print("   ✓ Persisted")
 
     print("\n3. Simulating different pod (deleting local file)...")
@@ -43,7 +45,9 @@ async def test_restore_cycle():
     print("   ✓ Restored")
 
     print("\n5. Verifying restored file...")
-    restored_lines = jsonl_handler.read_jsonl_file(test_session_id)
+    restored_lines = await asyncio.to_thread(
+        jsonl_handler.read_jsonl_file, test_session_id
+    )
     print(f"   Restored has {len(restored_lines)} lines")
 
     # Compare
@@ -54,13 +58,14 @@ async def test_restore_cycle():
             f"   ❌ Line count mismatch: {len(original_lines)} → {len(restored_lines)}"
         )
 
-    matches = sum(
-        1
-        for i, (orig, rest) in enumerate(
-            zip(original_lines, restored_lines, strict=False)
+    # Whole-list comparison first; count line by line only on a mismatch
+    if restored_lines == original_lines:
+        matches = len(original_lines)
+    else:
+        matches = sum(
+            orig == rest
+            for orig, rest in zip(original_lines, restored_lines, strict=False)
         )
-        if orig == rest
-    )
     print(f"   ✓ {matches}/{len(original_lines)} lines match exactly")
 
     if matches == len(original_lines):
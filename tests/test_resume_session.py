@@ -69,7 +69,7 @@ async def test_jsonl_persistence():
     await session_store.close()
 
 
-async def test_project_path():
+def test_project_path():
     """Test project path generation."""
     print("\nTesting project path generation...")
 
@@ -88,8 +88,8 @@ async def test_project_path():
 if __name__ == "__main__":
     print("=== Resume Session Feature Tests ===\n")
 
-    # Run tests
-    asyncio.run(test_project_path())
+    # Run tests (only the persistence test needs an event loop)
+    test_project_path()
     asyncio.run(test_jsonl_persistence())
 
     print("\n=== All Tests Complete ===")